@@ -1,8 +1,13 @@
+import re
+import json
 import scrapy
-from urllib.parse import urljoin
+from collections import OrderedDict
+from itertools import zip_longest
+from urllib.parse import urljoin, urlparse
 from gemini_crawler.items import GeminiCrawlerItem
 import os
-import requests
+from selectolax.lexbor import LexborHTMLParser
+from pybloom_live import ScalableBloomFilter
 
 # Import Gemini API (google-generativeai)
 import google.generativeai as genai
@@ -13,57 +18,185 @@ if gemini_api_key:
     genai.configure(api_key=gemini_api_key)
     gemini_model = genai.GenerativeModel('gemini-2.0-flash-lite')
 
+# Structured output: Gemini replies with a JSON array matching this schema, so it parses directly
+_LINK_VERDICTS_OUTPUT = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": {"i": {"type": "INTEGER"}, "is_blog_link": {"type": "BOOLEAN"}},
+            "required": ["i", "is_blog_link"],
+        },
+    },
+}
+
+# Heuristic used when Gemini is unavailable or fails
+_DATE_URL_RE = re.compile(r'/\d{4}/\d{2}/')
+
+# Cheap pre-filter applied before any Gemini call
+_NON_ARTICLE_RE = re.compile(
+    r'(/tag/|/category/|/author/|/page/\d+|/feed/?$|[?&]s=|'
+    r'\.(?:jpg|jpeg|png|gif|css|js|ico|svg|pdf|zip)(?:\?|$)|/wp-(?:admin|login|json)/|'
+    r'^(?:mailto|tel|javascript):)',
+    re.IGNORECASE
+)
+_DATED_ARTICLE_RE = re.compile(r'/\d{4}/\d{2}/\d{2}/')
+
+# Gemini decisions keyed by URL shape, so /blog/post-a and /blog/post-b share one answer
+_PATTERN_CACHE_SIZE = 4096
+_pattern_cache = OrderedDict()
+_DIGITS_RE = re.compile(r'\d+')
+_SLUG_SEGMENT_RE = re.compile(r'[^/]*[-_][^/]*')
+# A slug segment only becomes '*' once its prefix has produced this many distinct slugs
+_SLUG_COLLAPSE_MIN = 3
+_slugs_by_prefix = OrderedDict()
+
+
+def _slug_positions(url):
+    # Yield (index, prefix, slug) for every slug segment below the site root; top-level pages like /about-us stay exact
+    parsed = urlparse(url)
+    segments = parsed.path.split('/')
+    for k, segment in enumerate(segments):
+        if k > 1 and _SLUG_SEGMENT_RE.fullmatch(segment):
+            prefix = parsed.netloc.lower() + '/'.join(_DIGITS_RE.sub('#', part) for part in segments[:k])
+            yield k, prefix, segment
+
+
+def _note_slugs(url):
+    for _, prefix, slug in _slug_positions(url):
+        slugs = _slugs_by_prefix.setdefault(prefix, set())
+        if len(slugs) < _SLUG_COLLAPSE_MIN:
+            slugs.add(slug)
+        _slugs_by_prefix.move_to_end(prefix)
+        if len(_slugs_by_prefix) > _PATTERN_CACHE_SIZE:
+            _slugs_by_prefix.popitem(last=False)
+
+
+def _url_pattern(url):
+    parsed = urlparse(url)
+    segments = [_DIGITS_RE.sub('#', segment) for segment in parsed.path.split('/')]
+    for k, prefix, _ in _slug_positions(url):
+        if len(_slugs_by_prefix.get(prefix, ())) >= _SLUG_COLLAPSE_MIN:
+            segments[k] = '*'
+    return parsed.netloc.lower() + '/'.join(segments)
+
+
+def _interleave_by_domain(links):
+    # Round-robin across hosts so consecutive requests hit different domains
+    by_domain = OrderedDict()
+    for link in links:
+        by_domain.setdefault(urlparse(link).netloc.lower(), []).append(link)
+    return [link for group in zip_longest(*by_domain.values()) for link in group if link is not None]
+
+
+def _remember_pattern(pattern, is_article):
+    _pattern_cache[pattern] = is_article
+    _pattern_cache.move_to_end(pattern)
+    if len(_pattern_cache) > _PATTERN_CACHE_SIZE:
+        _pattern_cache.popitem(last=False)
+
 class GeminiSpider(scrapy.Spider):
     name = 'gemini_spider'
     custom_settings = {
         'DOWNLOAD_DELAY': 0.5,
         'ROBOTSTXT_OBEY': False,  # Ignore robots.txt for bulk scraping
+        # Throttle each domain on its own so different hosts can be fetched in parallel
+        'AUTOTHROTTLE_ENABLED': True,
+        'AUTOTHROTTLE_START_DELAY': 0.5,
+        'AUTOTHROTTLE_TARGET_CONCURRENCY': 2.0,
+        'CONCURRENT_REQUESTS': 32,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 4,
     }
 
     def __init__(self, start_url=None, max_links=10, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.start_urls = [start_url] if start_url else []
         self.max_links = int(max_links)
-        self.visited = set()
+        # Constant-memory membership check; a false positive only skips a link
+        self.visited = ScalableBloomFilter(initial_capacity=10000, error_rate=0.001)
 
     def parse(self, response):
         # Collect all links on the page
         links = set()
-        for href in response.css('a::attr(href)').getall():
-            full_url = urljoin(response.url, href)
+        tree = LexborHTMLParser(response.text)
+        for node in tree.css('a[href]'):
+            full_url = urljoin(response.url, node.attributes.get('href') or '')
             if full_url not in self.visited:
                 links.add(full_url)
-        links = list(links)[:self.max_links]
-        # Use Gemini to filter links
-        for link in links:
-            is_article = self.is_article_link_gemini(link)
+        links = _interleave_by_domain(list(links)[:self.max_links])
+        # Use Gemini to filter links, one request for the whole page
+        decisions = self._classify_links_batch(links)
+        for link, is_article in zip(links, decisions):
             print(f"[GeminiSpider] Link: {link} | Is Article: {is_article}")
             if is_article:
                 yield scrapy.Request(link, callback=self.parse_article)
             self.visited.add(link)
 
     def is_article_link_gemini(self, url):
-        import re
+        return self._classify_links_batch([url])[0]
+
+    def _classify_links_batch(self, links):
+        # Settle obvious cases with a regex so only ambiguous links cost a Gemini lookup
+        results = [None] * len(links)
+        ambiguous = []
+        for i, link in enumerate(links):
+            if _NON_ARTICLE_RE.search(link):
+                results[i] = False
+            elif _DATED_ARTICLE_RE.search(link):
+                results[i] = True
+            else:
+                ambiguous.append(i)
+        if not ambiguous:
+            return results
         if not gemini_model:
-            return True  # fallback: allow all
+            for i in ambiguous:
+                results[i] = True  # fallback: allow all
+            return results
+        for i in ambiguous:
+            _note_slugs(links[i])
+        patterns = {i: _url_pattern(links[i]) for i in ambiguous}
+        # Only ask Gemini about one representative link per pattern it hasn't classified yet
+        uncached = {}
+        for i, pattern in patterns.items():
+            if pattern not in _pattern_cache and pattern not in uncached:
+                uncached[pattern] = links[i]
+        if uncached:
+            decisions = self._ask_gemini(list(uncached.values()))
+            if decisions is not None:
+                for pattern, is_article in zip(uncached, decisions):
+                    _remember_pattern(pattern, is_article)
+        for i, pattern in patterns.items():
+            if pattern in _pattern_cache:
+                _pattern_cache.move_to_end(pattern)
+                results[i] = _pattern_cache[pattern]
+            else:
+                # Fallback: simple heuristic when Gemini gave no answer
+                results[i] = self._heuristic_is_article(links[i])
+        return results
+
+    def _ask_gemini(self, links):
+        numbered = '\n'.join(f"{i}. {link}" for i, link in enumerate(links))
         prompt = f"""
-        Given the following URL, is it likely to be a blog post, article, or guide (not a homepage, tag, category, or resource page)? 
-        If the URL points to a specific post or article, respond with: {{\"is_blog_link\": true}}. 
-        If not, respond with: {{\"is_blog_link\": false}}.
-        URL: {url}
-        Respond with only the JSON object.
+        For each numbered URL below, decide if it is likely to be a blog post, article, or guide (not a homepage, tag, category, or resource page).
+        Respond with only a JSON array containing one object per URL, for example:
+        [{{\"i\": 0, \"is_blog_link\": true}}, {{\"i\": 1, \"is_blog_link\": false}}]
+        URLs:
+        {numbered}
         """
         try:
-            response = gemini_model.generate_content(prompt)
+            response = gemini_model.generate_content(prompt, generation_config=_LINK_VERDICTS_OUTPUT)
             if response and response.text:
-                print(f"[GeminiSpider] Gemini raw response for {url}: {response.text}")
-                import json
-                result = json.loads(response.text.strip().split('\n')[0])
-                return bool(result.get("is_blog_link", False))
+                print(f"[GeminiSpider] Gemini raw response for {len(links)} links: {response.text}")
+                result = json.loads(response.text)
+                decisions = {int(entry["i"]): bool(entry.get("is_blog_link", False)) for entry in result}
+                return [decisions.get(i, False) for i in range(len(links))]
         except Exception as e:
-            print(f"[GeminiSpider] Gemini error for {url}: {e}")
-        # Fallback: simple heuristic
-        if re.search(r'/\\d{4}/\\d{2}/', url) or url.endswith('.html'):
+            print(f"[GeminiSpider] Gemini error for batch of {len(links)} links: {e}")
+        return None
+
+    def _heuristic_is_article(self, url):
+        if _DATE_URL_RE.search(url) or url.endswith('.html'):
             print(f"[GeminiSpider] Heuristic matched for {url}: True")
             return True
         print(f"[GeminiSpider] Heuristic matched for {url}: False")
@@ -73,8 +206,12 @@ class GeminiSpider(scrapy.Spider):
         # Simple extraction: get title and main text
         item = GeminiCrawlerItem()
         item['url'] = response.url
-        item['title'] = response.css('title::text').get() or ''
-        item['content'] = ' '.join(response.css('body *::text').getall()).strip()
+        tree = LexborHTMLParser(response.text)
+        title_node = tree.css_first('title')
+        item['title'] = title_node.text(strip=True) if title_node else ''
+        # Drop non-content nodes in C, then collapse whitespace like XPath normalize-space()
+        tree.strip_tags(['script', 'style', 'noscript'])
+        item['content'] = ' '.join(tree.body.text(separator=' ').split()) if tree.body else ''
         item['author'] = ''
         item['category'] = 'article'
         yield item 
\ No newline at end of file
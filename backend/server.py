@@ -1,40 +1,46 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple, Hashable, Any
 import uuid
+import hashlib
+import codecs
 from datetime import datetime
-import tempfile
 import asyncio
-import aiofiles
-import json
-import io
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict, deque
+import time
+import orjson
 import re
+import tempfile
+import textwrap
+from string import Template
 
 # Scraping libraries
-import newspaper
-from newspaper import Article
+# newspaper3k (pulls in NLTK) and PyMuPDF (PDF workers only) are imported where they are used
+# to keep worker start-up fast
 import trafilatura
-import fitz  # PyMuPDF
-import pdfplumber
-from markdownify import markdownify as md
-from bs4 import BeautifulSoup
-import html2text
+from resiliparse.parse.html import HTMLTree
+from resiliparse.extract.html2text import extract_plain_text
+from resiliparse.parse.encoding import detect_encoding, bytes_to_str
+from selectolax.lexbor import LexborHTMLParser
 from readability import Document
-import requests
+from markdownify import MarkdownConverter, ATX
+import aiohttp
+from pybloom_live import ScalableBloomFilter
 from urllib.parse import urlparse, urljoin, urlunparse
-import requests
-from typing import Set, Any
 
 # Gemini AI
 import google.generativeai as genai
-import subprocess
 
 
 ROOT_DIR = Path(__file__).parent
@@ -53,8 +59,241 @@ if gemini_api_key:
 else:
     logging.warning("Gemini API key not found")
 
-# Create the main app without a prefix
-app = FastAPI()
+# Browser-like headers used for page fetches
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'DNT': '1',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Largest HTML page we are willing to download and parse
+MAX_HTML_BYTES = 5 * 1024 * 1024
+
+# Retry policy for page fetches: transient statuses and dropped connections, with exponential backoff
+FETCH_RETRIES = 2
+FETCH_RETRY_BACKOFF = 0.2
+FETCH_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Byte order marks, which override any declared charset
+_BOM_ENCODINGS = ((codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be'))
+
+
+def _decode_html(body: bytes, declared: Optional[str]) -> str:
+    """Decode a page by its BOM, then the Content-Type charset, then <meta charset> or content sniffing"""
+    encoding = next((name for bom, name in _BOM_ENCODINGS if body.startswith(bom)), None)
+    encoding = encoding or declared or detect_encoding(body, from_html_meta=True)
+    return bytes_to_str(body, encoding, errors='replace')
+
+
+# Precompiled patterns for markdown cleanup
+_RE_TRIPLE_NL = re.compile(r'\n\s*\n\s*\n')
+_RE_WS = re.compile(r'[ \t]+')
+_RE_EMPTY_LINK = re.compile(r'\[\]\([^)]*\)')
+_RE_LINE = re.compile(r'^.+$', re.MULTILINE)
+
+# Trailing characters that mark a line as running text rather than a header
+_SENT_END = frozenset('.,;')
+
+
+def _format_markdown_line(line: str) -> str:
+    """Turn one already-trimmed, non-empty line of plain text into markdown using a simple header heuristic"""
+    length = len(line)
+    if length >= 100:
+        # Too long for either header rule
+        return line
+    if line.isupper():
+        return f"## {line.title()}"
+    if length < 80 and line[-1] not in _SENT_END:
+        # Possible header
+        return f"### {line}"
+    return line
+
+
+# Options are resolved once; convert() keeps no per-document state so worker threads can share it
+_MARKDOWN_CONVERTER = MarkdownConverter(heading_style=ATX)
+
+
+# Content type for discovered links, picked from a keyword in the URL
+_CONTENT_TYPE_BY_KEYWORD = {
+    'podcast': 'podcast_transcript',
+    'linkedin': 'linkedin_post',
+    'reddit': 'reddit_comment',
+}
+_RE_CONTENT_TYPE = re.compile('(' + '|'.join(_CONTENT_TYPE_BY_KEYWORD) + ')', re.IGNORECASE)
+
+# Query parameters that only track the visitor and never change the page
+_RE_TRACKING_PARAM = re.compile(r'^(?:utm_\w*|fbclid|gclid)$', re.IGNORECASE)
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _canonicalize_url(url: str) -> str:
+    """Normalize a URL so trivially different spellings of the same page dedupe together"""
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    try:
+        if parsed.port and _DEFAULT_PORTS.get(scheme) == parsed.port:
+            netloc = netloc.rsplit(':', 1)[0]
+    except ValueError:
+        pass
+    query = '&'.join(
+        pair for pair in parsed.query.split('&')
+        if pair and not _RE_TRACKING_PARAM.match(pair.split('=', 1)[0])
+    )
+    return urlunparse((scheme, netloc, parsed.path or '/', parsed.params, query, ''))
+
+
+# PDF structure detection: table-of-contents entries ("Title ..... 12") and numbered headings ("3. Results")
+# The TOC pattern scans whole pages, so its whitespace never crosses a line break
+_RE_TOC_ENTRY = re.compile(r'^[^\S\n]*([A-Z](?:[\w\-:]|[^\S\n])+)[^\S\n]+\.{2,}[^\S\n]*(\d+)[^\S\n]*$', re.MULTILINE)
+_RE_NUMBERED_HEADING = re.compile(r'^\d+\.\s+[A-Z]')
+
+
+# Gemini prompts, dedented once at import; only the marked fields are filled in per call
+GEMINI_MAX_CONTENT_CHARS = 8000
+GEMINI_MAX_HTML_CHARS = 15000
+
+_ENHANCE_PROMPT = Template(textwrap.dedent("""\
+    Analyze and enhance this web content. Return a JSON response with:
+    1. "content": Clean, well-formatted markdown content (preserve all important information)
+    2. "category": Content type (blog, tutorial, news, documentation, guide, research, podcast_transcript, linkedin_post, reddit_comment, book, other)
+    3. "title": Improved title if needed
+    4. "author": Extract author name if mentioned
+    5. "summary": Brief 2-3 sentence summary
+
+    URL: $url
+
+    Raw Content:
+    $content
+
+    Return only valid JSON:
+    """))
+
+_EXTRACT_HTML_PROMPT = Template(textwrap.dedent("""\
+    Extract the main content from this HTML webpage and return clean markdown.
+    Focus on the article/blog content, ignore navigation, ads, comments, etc.
+
+    URL: $url
+
+    Return JSON with:
+    {
+        "title": "Article title",
+        "content": "Full article content in markdown format",
+        "author": "Author name if found",
+        "category": "content type (blog, tutorial, news, etc.)"
+    }
+
+    HTML:
+    $html
+    """))
+
+_CLASSIFY_LINKS_PROMPT = Template(textwrap.dedent("""\
+    For each numbered URL below, decide if it is likely to be a blog post, article, or guide (not a homepage, tag, category, or resource page).
+    Respond with only a JSON array containing one object per URL, for example:
+    [{"i": 0, "is_blog_link": true}, {"i": 1, "is_blog_link": false}]
+    URLs:
+    $urls
+    """))
+
+_DIRECT_FETCH_PROMPT = Template(textwrap.dedent("""\
+    Fetch the content from the following URL and extract the main article, blog post, or guide. Return the result as JSON with keys: title, content (markdown), author (if found), and category. If the page is not accessible, return an empty content string.
+    URL: $url
+    """))
+
+# Structured output: Gemini is asked for JSON matching these schemas, so replies parse directly
+def _json_output(schema: Dict[str, Any]) -> Dict[str, Any]:
+    return {"response_mime_type": "application/json", "response_schema": schema}
+
+_ARTICLE_PROPERTIES = {
+    "title": {"type": "STRING"},
+    "content": {"type": "STRING"},
+    "author": {"type": "STRING", "nullable": True},
+    "category": {"type": "STRING"},
+}
+_ARTICLE_OUTPUT = _json_output({"type": "OBJECT", "properties": _ARTICLE_PROPERTIES, "required": ["content"]})
+_ENHANCE_OUTPUT = _json_output({
+    "type": "OBJECT",
+    "properties": {**_ARTICLE_PROPERTIES, "summary": {"type": "STRING"}},
+    "required": ["content", "category"],
+})
+_LINK_VERDICTS_OUTPUT = _json_output({
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"i": {"type": "INTEGER"}, "is_blog_link": {"type": "BOOLEAN"}},
+        "required": ["i", "is_blog_link"],
+    },
+})
+
+
+def _parse_gemini_json(text: str) -> Any:
+    """Parse a structured-output reply; None if it is not valid JSON (e.g. cut off at the output token limit)"""
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return None
+
+
+# How many discovered links bulk scraping fetches at once
+BULK_SCRAPE_CONCURRENCY = 8
+
+# PDF uploads are read in chunks and rejected once they pass the cap
+MAX_PDF_BYTES = 50 * 1024 * 1024
+UPLOAD_READ_CHUNK = 1024 * 1024
+
+# PDFs with at least this many pages have their text extracted in parallel shards across pdf_pool;
+# smaller ones are not worth reopening the document in several workers
+PDF_SHARD_MIN_PAGES = 16
+# Fewest pages a single shard is given, so each worker's reopen of the document is amortized
+PDF_SHARD_SIZE_FLOOR = 8
+
+# Below this many words a local extraction is treated as poor and the next fallback is tried
+MIN_EXTRACTED_WORDS = int(os.environ.get('GEMINI_FALLBACK_MIN_WORDS', '100'))
+# A short extraction from a page smaller than this is taken as a genuinely short page, not worth a Gemini fetch
+GEMINI_FALLBACK_MIN_HTML_CHARS = 20000
+
+# Extraction results kept for repeat scrapes of the same page
+SCRAPE_CACHE_SIZE = 1000
+SCRAPE_CACHE_TTL = 3600
+# What scrape_url reuses from a stored row when the page answers 304 Not Modified
+_STORED_EXTRACTION_FIELDS = ("title", "content", "content_type", "author", "word_count",
+                             "extraction_method", "etag", "last_modified")
+
+# Gemini enhancement and link classification results kept for identical inputs
+GEMINI_CACHE_SIZE = 2000
+GEMINI_CACHE_TTL = 24 * 3600
+
+# URLs sent to Gemini per link classification prompt
+GEMINI_LINK_BATCH = 50
+
+# Upper bound on rows returned by one knowledge base listing
+KNOWLEDGE_BASE_LIMIT = 1000
+
+# "team_id:canonical URL" for every page a team has saved, so bulk crawls only look up pages it may already have.
+# Keys are added once a write succeeds; since deletes can't be removed from it, a hit is confirmed against Mongo.
+scraped_urls = ScalableBloomFilter(initial_capacity=100000, error_rate=0.001)
+# Index holding exactly the fields the bloom filter is loaded from, so that startup scan and hit checks are index-only
+_SCRAPED_URLS_INDEX = [("team_id", 1), ("source_url", 1)]
+
+
+def _scraped_key(team_id: str, url: str) -> str:
+    return f"{team_id}:{_canonicalize_url(url)}"
+
+
+def _remember_scraped(docs: List[Dict[str, Any]]):
+    """Add saved documents to scraped_urls; only call this once their write has succeeded"""
+    for doc in docs:
+        if doc.get("source_url"):
+            scraped_urls.add(_scraped_key(doc["team_id"], doc["source_url"]))
+
+
+# Shared HTTP session, created on startup so it is bound to the server's event loop
+http_session: Optional[aiohttp.ClientSession] = None
+
+# Create the main app without a prefix; orjson keeps large markdown responses cheap to encode
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -81,6 +320,23 @@ class ScrapedContent(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     word_count: int = 0
     extraction_method: str = ""  # 'newspaper', 'trafilatura', 'pymupdf', etc.
+    # HTTP validators from the fetch, used to revalidate the page on the next scrape
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+class ScrapedContentSummary(BaseModel):
+    """Knowledge base listing row; content is only filled in when requested"""
+    id: str
+    title: str
+    content: Optional[str] = None
+    content_type: str
+    source_url: Optional[str] = None
+    author: Optional[str] = None
+    user_id: Optional[str] = None
+    team_id: str
+    created_at: datetime
+    word_count: int = 0
+    extraction_method: str = ""
 
 class ScrapeUrlRequest(BaseModel):
     url: str
@@ -106,13 +362,220 @@ class BulkScrapeResponse(BaseModel):
     items: List[ScrapedContent]
 
 
+# Fields an upsert only writes when it creates the row, so a re-scrape keeps the row's identity and listing position
+UPSERT_INSERT_ONLY_FIELDS = ("id", "created_at")
+
+
+async def _insert_many_logged(collection, docs: List[Dict[str, Any]], label: str,
+                              upsert_on: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+    """
+    insert_many with ordered=False so Mongo keeps going past individual failures, logging each one that fails.
+    With upsert_on, each doc instead updates the existing row matching those fields (or creates it) in one bulk_write;
+    UPSERT_INSERT_ONLY_FIELDS are left as they were on an existing row.
+    Returns the docs that were saved.
+    """
+    try:
+        if upsert_on:
+            requests = [
+                UpdateOne(
+                    {key: doc[key] for key in upsert_on},
+                    {"$set": {k: v for k, v in doc.items() if k not in UPSERT_INSERT_ONLY_FIELDS},
+                     "$setOnInsert": {k: doc[k] for k in UPSERT_INSERT_ONLY_FIELDS if k in doc}},
+                    upsert=True,
+                )
+                for doc in docs
+            ]
+            await collection.bulk_write(requests, ordered=False)
+        else:
+            await collection.insert_many(docs, ordered=False)
+        return docs
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        logging.warning(f"Saved {len(docs) - len(write_errors)} of {len(docs)} {label}; {len(write_errors)} failed")
+        for error in write_errors:
+            doc_id = docs[error["index"]].get("id")
+            logging.warning(f"Failed to save {label} #{error['index']} (id {doc_id}): {error.get('errmsg')}")
+        failed = {error["index"] for error in write_errors}
+        return [doc for i, doc in enumerate(docs) if i not in failed]
+    except Exception as e:
+        logging.warning(f"Failed to save {len(docs)} {label} to database: {e}")
+        return []
+
+
+class ScrapedContentWriter:
+    """
+    Buffers scraped documents and writes them to MongoDB in batches with insert_many
+    """
+    # Queued by stop() to end _run once everything ahead of it is written
+    _STOP = object()
+
+    def __init__(self, collection, batch_size: int = 50, flush_interval: float = 0.2,
+                 upsert_on: Tuple[str, ...] = ()):
+        self.collection = collection
+        self.upsert_on = upsert_on
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            # The sentinel queues up behind every pending doc, so _run writes them all and then returns
+            await self.queue.put(self._STOP)
+            await self.task
+        # Flush anything put after the sentinel
+        batch = []
+        while self.queue and not self.queue.empty():
+            doc = self.queue.get_nowait()
+            if doc is not self._STOP:
+                batch.append(doc)
+        if batch:
+            await self._flush(batch)
+
+    async def put(self, doc: Dict[str, Any]):
+        await self.queue.put(doc)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        stopping = False
+        try:
+            while not stopping:
+                doc = await self.queue.get()
+                if doc is self._STOP:
+                    return
+                batch = [doc]
+                deadline = loop.time() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        doc = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if doc is self._STOP:
+                        stopping = True
+                        break
+                    batch.append(doc)
+                await self._flush(batch)
+                batch = []
+        finally:
+            # Docs already taken off the queue were reported as saved, so they are written even if the task dies
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        _remember_scraped(await _insert_many_logged(self.collection, batch, "scraped items", upsert_on=self.upsert_on))
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests to the same host while letting different hosts proceed in parallel
+    """
+    def __init__(self, min_interval: float = 0.5):
+        self.min_interval = min_interval
+        self.locks: Dict[str, asyncio.Lock] = {}
+        # Oldest request first, so idle hosts can be dropped from the front
+        self.last_request: "OrderedDict[str, float]" = OrderedDict()
+
+    async def wait(self, host: str):
+        lock = self.locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            delay = self.last_request.get(host, 0.0) + self.min_interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = loop.time()
+            self.last_request[host] = now
+            self.last_request.move_to_end(host)
+            self._prune(now)
+
+    def _prune(self, now: float):
+        # A host idle for longer than the interval would not be delayed anyway, so forgetting it loses nothing
+        while self.last_request:
+            host, last = next(iter(self.last_request.items()))
+            if now - last < self.min_interval or self.locks[host].locked():
+                break
+            del self.last_request[host]
+            del self.locks[host]
+
+
+class ResultCache:
+    """
+    Small in-process LRU with a TTL, used to skip repeat scrapes and repeat Gemini calls
+    """
+    def __init__(self, maxsize: int = 1000, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+class WorkerPool:
+    """
+    ProcessPoolExecutor that replaces itself when a dead worker (segfault, OOM kill) has broken it
+    """
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    async def run(self, fn, *args):
+        """run_in_executor on the pool, rebuilding it and retrying once if it is broken"""
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = self.executor
+            try:
+                return await loop.run_in_executor(executor, fn, *args)
+            except BrokenProcessPool:
+                if attempt:
+                    raise
+                logging.warning(f"Worker pool broke while running {fn.__name__}, restarting it")
+                # Concurrent callers all see the same broken pool; only the first one replaces it
+                if self.executor is executor:
+                    self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                    executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Worker processes for CPU-bound HTML extraction and PDF parsing, so they use every core instead of sharing the GIL.
+# PDFs get their own pool so a malformed upload that kills a worker can't break HTML scraping too.
+html_pool = WorkerPool(max_workers=os.cpu_count())
+pdf_pool = WorkerPool(max_workers=os.cpu_count())
+
+
 class ContentScraper:
     def __init__(self):
-        self.h = html2text.HTML2Text()
-        self.h.ignore_links = False
-        self.h.ignore_images = False
-        self.h.body_width = 0
-        
+        # Politeness delay between scrapes of the same host during bulk runs
+        self.host_limiter = HostRateLimiter(min_interval=0.5)
+        # Recent results keyed by (canonical URL, requested content type)
+        self.scrape_cache = ResultCache(maxsize=SCRAPE_CACHE_SIZE, ttl=SCRAPE_CACHE_TTL)
+        # Gemini answers keyed by a digest of the content sent, and link verdicts keyed by URL
+        self.enhance_cache = ResultCache(maxsize=GEMINI_CACHE_SIZE, ttl=GEMINI_CACHE_TTL)
+        self.link_cache = ResultCache(maxsize=GEMINI_CACHE_SIZE, ttl=GEMINI_CACHE_TTL)
+
         # Initialize Gemini model
         self.gemini_model = None
         if gemini_api_key:
@@ -122,7 +585,7 @@ class ContentScraper:
             except Exception as e:
                 logging.warning(f"Failed to initialize Gemini model: {e}")
     
-    def _enhance_content_with_gemini(self, raw_content: str, url: str) -> Dict[str, Any]:
+    async def _enhance_content_with_gemini(self, raw_content: str, url: str) -> Dict[str, Any]:
         """
         Use Gemini AI to enhance and categorize content
         """
@@ -130,61 +593,30 @@ class ContentScraper:
             if not self.gemini_model or not raw_content.strip():
                 return {"content": raw_content, "category": "blog", "enhanced": False}
             
-            prompt = f"""
-            Analyze and enhance this web content. Return a JSON response with:
-            1. "content": Clean, well-formatted markdown content (preserve all important information)
-            2. "category": Content type (blog, tutorial, news, documentation, guide, research, podcast_transcript, linkedin_post, reddit_comment, book, other)
-            3. "title": Improved title if needed
-            4. "author": Extract author name if mentioned
-            5. "summary": Brief 2-3 sentence summary
-            
-            URL: {url}
+            # Mirrors and re-scrapes send the same text; only the part in the prompt matters for the key
+            content_slice = raw_content[:GEMINI_MAX_CONTENT_CHARS]
+            cache_key = hashlib.blake2b(content_slice.encode(), digest_size=16).digest()
+            cached = self.enhance_cache.get(cache_key)
+            if cached:
+                return cached
             
-            Raw Content:
-            {raw_content[:8000]}  # Limit to avoid token limits
+            prompt = _ENHANCE_PROMPT.substitute(url=url, content=content_slice)
             
-            Return only valid JSON:
-            """
-            
-            response = self.gemini_model.generate_content(prompt)
+            response = await self.gemini_model.generate_content_async(prompt, generation_config=_ENHANCE_OUTPUT)
             
             if response and response.text:
-                # Try to parse JSON response
-                import json
-                try:
-                    result = json.loads(response.text.strip())
+                result = _parse_gemini_json(response.text)
+                if result is not None:
                     result["enhanced"] = True
+                    self.enhance_cache.put(cache_key, result)
                     return result
-                except json.JSONDecodeError:
-                    # If not JSON, try to extract content between JSON markers
-                    text = response.text.strip()
-                    if "```json" in text:
-                        json_start = text.find("```json") + 7
-                        json_end = text.find("```", json_start)
-                        if json_end > json_start:
-                            try:
-                                result = json.loads(text[json_start:json_end])
-                                result["enhanced"] = True
-                                return result
-                            except:
-                                pass
-                    
-                    # Fallback: return enhanced content as markdown
-                    return {
-                        "content": text,
-                        "category": "blog", 
-                        "enhanced": True,
-                        "title": None,
-                        "author": None,
-                        "summary": None
-                    }
                     
         except Exception as e:
             logging.warning(f"Gemini enhancement failed: {e}")
         
         return {"content": raw_content, "category": "blog", "enhanced": False}
     
-    def _extract_content_with_gemini(self, url: str) -> Dict[str, Any]:
+    async def _extract_content_with_gemini(self, url: str) -> Dict[str, Any]:
         """
         Use Gemini as a fallback to extract content when traditional methods fail
         """
@@ -192,151 +624,21 @@ class ContentScraper:
             if not self.gemini_model:
                 return None
             
-            # Get raw HTML
-            response = requests.get(url, timeout=30, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status()
+            # Get raw HTML, limited to avoid token limits
+            html_content = (await self._fetch_html(url))[:GEMINI_MAX_HTML_CHARS]
             
-            # Limit HTML size to avoid token limits
-            html_content = response.text[:15000]
+            prompt = _EXTRACT_HTML_PROMPT.substitute(url=url, html=html_content)
             
-            prompt = f"""
-            Extract the main content from this HTML webpage and return clean markdown. 
-            Focus on the article/blog content, ignore navigation, ads, comments, etc.
-            
-            URL: {url}
-            
-            Return JSON with:
-            {{
-                "title": "Article title",
-                "content": "Full article content in markdown format",
-                "author": "Author name if found",
-                "category": "content type (blog, tutorial, news, etc.)"
-            }}
-            
-            HTML:
-            {html_content}
-            """
-            
-            ai_response = self.gemini_model.generate_content(prompt)
+            ai_response = await self.gemini_model.generate_content_async(prompt, generation_config=_ARTICLE_OUTPUT)
             
             if ai_response and ai_response.text:
-                import json
-                try:
-                    result = json.loads(ai_response.text.strip())
-                    return result
-                except json.JSONDecodeError:
-                    # Try to extract JSON from response
-                    text = ai_response.text.strip()
-                    if "```json" in text:
-                        json_start = text.find("```json") + 7
-                        json_end = text.find("```", json_start)
-                        if json_end > json_start:
-                            try:
-                                return json.loads(text[json_start:json_end])
-                            except:
-                                pass
-                    
-                    # Fallback: treat as markdown content
-                    return {
-                        "title": self._extract_title_from_url(url),
-                        "content": text,
-                        "author": None,
-                        "category": "blog"
-                    }
+                return _parse_gemini_json(ai_response.text)
                     
         except Exception as e:
             logging.warning(f"Gemini extraction failed for {url}: {e}")
         
         return None
         
-    def _is_valid_blog_link(self, url: str, base_domain: str) -> bool:
-        """
-        Use Gemini API to decide if a URL is likely a blog post or article link. Fallback to old logic if Gemini is unavailable.
-        """
-        try:
-            # Use Gemini if available
-            if self.gemini_model:
-                prompt = f"""
-                Given the following URL and base domain, decide if the URL is likely a blog post, article, or guide (not a homepage, tag, category, or resource page). Return true or false as JSON.
-                Base domain: {base_domain}
-                URL: {url}
-                Respond with: {{"is_blog_link": true}} or {{"is_blog_link": false}}
-                """
-                response = self.gemini_model.generate_content(prompt)
-                if response and response.text:
-                    import json
-                    try:
-                        result = json.loads(response.text.strip().split('\n')[0])
-                        return bool(result.get("is_blog_link", False))
-                    except Exception:
-                        pass
-            # Fallback to old logic
-            parsed = urlparse(url)
-            if not parsed.scheme in ['http', 'https']:
-                return False
-            skip_patterns = [
-                r'/tag/', r'/category/', r'/author/', r'/search/',
-                r'/about', r'/contact', r'/privacy', r'/terms',
-                r'/wp-admin/', r'/wp-content/', r'/feed',
-                r'\.css$', r'\.js$', r'\.png$', r'\.jpg$', r'\.jpeg$', r'\.gif$', r'\.pdf$',
-                r'#', r'mailto:', r'tel:', r'javascript:',
-                r'/page/\d+', r'/\d{4}/$', r'/\d{4}/\d{2}/$'
-            ]
-            for pattern in skip_patterns:
-                if re.search(pattern, url, re.IGNORECASE):
-                    return False
-            article_patterns = [
-                r'/\d{4}/\d{2}/\d{2}/',  # Date-based URLs
-                r'/posts?/', r'/articles?/', r'/blog/',
-                r'/\d+/', r'/[a-zA-Z0-9-]+/$'  # Slug-based URLs
-            ]
-            for pattern in article_patterns:
-                if re.search(pattern, url, re.IGNORECASE):
-                    return True
-            if parsed.path and len(parsed.path) > 1 and not parsed.path.endswith('/'):
-                return True
-            return False
-        except Exception:
-            return False
-    
-    def _extract_links_from_content(self, html_content: str, base_url: str) -> List[str]:
-        """
-        Extract potential blog/article links from HTML content
-        """
-        try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            links = []
-            base_domain = urlparse(base_url).netloc
-            
-            # Find all links
-            for link in soup.find_all('a', href=True):
-                href = link.get('href')
-                if not href:
-                    continue
-                
-                # Convert relative URLs to absolute
-                full_url = urljoin(base_url, href)
-                
-                # Check if it's a valid blog link
-                if self._is_valid_blog_link(full_url, base_domain):
-                    links.append(full_url)
-            
-            # Remove duplicates while preserving order
-            seen = set()
-            unique_links = []
-            for link in links:
-                if link not in seen:
-                    seen.add(link)
-                    unique_links.append(link)
-            
-            return unique_links
-            
-        except Exception as e:
-            logging.warning(f"Failed to extract links from content: {e}")
-            return []
-    
     async def bulk_scrape_with_links(self, url: str, team_id: str, user_id: Optional[str] = None, 
                                    max_depth: int = 1, max_links: int = 10, 
                                    include_base_url: bool = True) -> BulkScrapeResponse:
@@ -344,77 +646,78 @@ class ContentScraper:
         Scrape a URL and discover/follow links to scrape additional content
         """
         scraped_items = []
-        processed_urls = set()
         link_decisions = []
         try:
+            follow_links = max_depth > 0 and max_links > 0
+            # Fetch the base page once; its HTML feeds both the base scrape and link discovery
+            html = None
+            validators = None
+            if include_base_url or follow_links:
+                try:
+                    html, validators = await self._fetch_page(url)
+                except Exception as e:
+                    logging.warning(f"Failed to fetch base URL {url}: {e}")
+            visited = {_canonicalize_url(url)}
             # Step 1: Scrape the base URL
             if include_base_url:
                 try:
-                    base_content = await self.scrape_url(url, team_id, user_id, "blog")
+                    base_content = await self.scrape_url(url, team_id, user_id, "blog", html=html, validators=validators)
                     scraped_items.append(base_content)
-                    processed_urls.add(url)
                 except Exception as e:
                     logging.warning(f"Failed to scrape base URL {url}: {e}")
-            # Step 2: Extract all links from the base URL (no filtering)
-            if max_depth > 0 and max_links > 0:
+            # Step 2: Breadth-first crawl; the frontier holds (link, depth) and max_links caps the links considered
+            frontier = deque()
+            if follow_links and html:
+                # Parsing a large page for links is CPU work, keep it off the event loop
+                base_links = await asyncio.get_running_loop().run_in_executor(None, self._collect_links, html, url)
+                frontier.extend((link, 1) for link in base_links)
+            semaphore = asyncio.Semaphore(BULK_SCRAPE_CONCURRENCY)
+            budget = max_links
+            while frontier and budget > 0:
                 try:
-                    response = requests.get(url, timeout=30, headers={
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                    })
-                    response.raise_for_status()
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    all_links = []
-                    for link in soup.find_all('a', href=True):
-                        href = link.get('href')
-                        if not href:
+                    # Links are queued in depth order, so the head of the frontier is the next level
+                    depth = frontier[0][1]
+                    level = []
+                    while frontier and frontier[0][1] == depth and len(level) < budget:
+                        link, _ = frontier.popleft()
+                        if link in visited:
                             continue
-                        full_url = urljoin(url, href)
-                        if full_url not in all_links:
-                            all_links.append(full_url)
-                    # Limit the number of links to process
-                    all_links = all_links[:max_links]
-                    # Step 3: Use Gemini to check if each link is an article/blog/guide
-                    for link in all_links:
-                        if link in processed_urls:
+                        visited.add(link)
+                        if await self._already_stored(team_id, link):
+                            logging.info(f"Skipping {link}, already in the knowledge base for team {team_id}")
                             continue
-                        is_article = False
-                        if self.gemini_model:
-                            prompt = f"""
-                            Is the following URL likely to be a blog post, article, or guide (not a homepage, tag, category, or resource page)? Return true or false as JSON.\nURL: {link}\nRespond with: {{\"is_blog_link\": true}} or {{\"is_blog_link\": false}}"""
-                            response = self.gemini_model.generate_content(prompt)
-                            if response and response.text:
-                                import json
-                                try:
-                                    result = json.loads(response.text.strip().split('\n')[0])
-                                    is_article = bool(result.get("is_blog_link", False))
-                                except Exception:
-                                    pass
+                        level.append(link)
+                    budget -= len(level)
+                    # Step 3: Use Gemini to check which links are articles/blogs/guides, one prompt per batch
+                    decisions = ((await self._classify_links_gemini(level)) if self.gemini_model else None) or [False] * len(level)
+                    article_links = []
+                    for link, is_article in zip(level, decisions):
                         # Save decision for debugging/inspection
                         link_decisions.append({"url": link, "is_article": is_article})
                         if is_article:
-                            try:
-                                content_type = "blog"
-                                if "podcast" in link.lower():
-                                    content_type = "podcast_transcript"
-                                elif "linkedin" in link.lower():
-                                    content_type = "linkedin_post"
-                                elif "reddit" in link.lower():
-                                    content_type = "reddit_comment"
-                                link_content = await self.scrape_url(link, team_id, user_id, content_type)
-                                scraped_items.append(link_content)
-                                processed_urls.add(link)
-                                await asyncio.sleep(0.5)
-                            except Exception as e:
-                                logging.warning(f"Failed to scrape discovered link {link}: {e}")
-                                continue
+                            article_links.append(link)
+                    # Step 4: Scrape the article links concurrently, spaced out per host;
+                    # pages above max_depth also hand back their links for the next level
+                    expand = depth < max_depth
+                    results = await asyncio.gather(
+                        *(self._scrape_one_safe(link, team_id, user_id, semaphore, expand) for link in article_links)
+                    )
+                    for link_content, page_links in results:
+                        if link_content:
+                            scraped_items.append(link_content)
+                        frontier.extend((link, depth + 1) for link in page_links if link not in visited)
                 except Exception as e:
-                    logging.warning(f"Failed to extract links from {url}: {e}")
-            # Step 4: Save all scraped content to database
-            for item in scraped_items:
-                try:
-                    await db.scraped_content.insert_one(item.dict())
-                except Exception as e:
-                    logging.warning(f"Failed to save item {item.id} to database: {e}")
+                    logging.warning(f"Failed to follow links from {url}: {e}")
+                    break
+            # Step 5: Save all scraped content to database
+            if scraped_items:
+                await self._reuse_stored_ids(team_id, scraped_items)
+                # One round trip for the whole batch; a page the team already has is updated rather than duplicated
+                saved = await _insert_many_logged(
+                    db.scraped_content, [item.model_dump() for item in scraped_items], "bulk items",
+                    upsert_on=("team_id", "source_url"),
+                )
+                _remember_scraped(saved)
             # Optionally, you can return link_decisions for debugging
             return BulkScrapeResponse(
                 team_id=team_id,
@@ -423,104 +726,307 @@ class ContentScraper:
         except Exception as e:
             logging.error(f"Bulk scraping failed for {url}: {e}")
             raise HTTPException(status_code=500, detail=f"Bulk scraping failed: {str(e)}")
-        
-    async def scrape_url(self, url: str, team_id: str, user_id: Optional[str] = None, content_type: str = "blog") -> ScrapedContent:
+    
+    async def _reuse_stored_ids(self, team_id: str, items: List[ScrapedContent]):
         """
-        Scrape content from a URL using multiple methods for best results, enhanced with Gemini AI
+        Give items that re-scrape a page the team already has that row's id and created_at,
+        which the upsert keeps, so the ids handed back match what is stored
         """
         try:
-            best_content = None
-            best_word_count = 0
-            extraction_methods_tried = []
-            # Method 1: Try newspaper3k first
+            cursor = db.scraped_content.find(
+                {"team_id": team_id, "source_url": {"$in": [item.source_url for item in items]}},
+                {"_id": 0, "source_url": 1, "id": 1, "created_at": 1},
+            )
+            stored = {doc["source_url"]: doc async for doc in cursor}
+        except Exception as e:
+            logging.warning(f"Failed to look up stored ids for team {team_id}: {e}")
+            return
+        for item in items:
+            row = stored.get(item.source_url)
+            if row:
+                item.id = row["id"]
+                item.created_at = row["created_at"]
+
+    def _collect_links(self, html: str, base_url: str) -> List[str]:
+        """
+        Return every link on a page as canonical absolute URLs, deduped in document order (no filtering)
+        """
+        # Menus and footers repeat the same hrefs; dict.fromkeys drops them before the urljoin/canonicalize work
+        hrefs = dict.fromkeys(node.attributes.get('href') for node in LexborHTMLParser(html).css('a[href]'))
+        links = []
+        seen = set()
+        for href in hrefs:
+            if not href:
+                continue
+            full_url = _canonicalize_url(urljoin(base_url, href))
+            if full_url not in seen:
+                seen.add(full_url)
+                links.append(full_url)
+        return links
+    
+    async def _classify_links_gemini(self, links: List[str]) -> Optional[List[bool]]:
+        """
+        Ask Gemini which links are articles, GEMINI_LINK_BATCH URLs per prompt. Returns None if any batch fails.
+        """
+        # Only links without a cached verdict go to Gemini
+        uncached = [link for link in dict.fromkeys(links) if self.link_cache.get(link) is None]
+        for start in range(0, len(uncached), GEMINI_LINK_BATCH):
+            batch = uncached[start:start + GEMINI_LINK_BATCH]
+            numbered = '\n'.join(f"{i}. {link}" for i, link in enumerate(batch))
+            prompt = _CLASSIFY_LINKS_PROMPT.substitute(urls=numbered)
             try:
-                article = Article(url)
-                article.download()
-                article.parse()
-                if article.text and len(article.text.strip()) > 50:
-                    word_count = len(article.text.split())
-                    if word_count > best_word_count:
-                        best_content = {
-                            "title": article.title or self._extract_title_from_url(url),
-                            "content": article.text,
-                            "author": ", ".join(article.authors) if article.authors else None,
-                            "method": "newspaper3k",
-                            "word_count": word_count
-                        }
-                        best_word_count = word_count
-                    extraction_methods_tried.append("newspaper3k")
-                    logging.info(f"Newspaper3k extracted {word_count} words from {url}")
+                response = await self.gemini_model.generate_content_async(prompt, generation_config=_LINK_VERDICTS_OUTPUT)
+                result = orjson.loads(response.text)
+                answers = {int(entry["i"]): bool(entry.get("is_blog_link", False)) for entry in result}
             except Exception as e:
-                logging.warning(f"Newspaper3k failed for {url}: {e}")
-            # Method 2: Try trafilatura
+                logging.warning(f"Gemini link classification failed for {len(batch)} links: {e}")
+                return None
+            for i, link in enumerate(batch):
+                self.link_cache.put(link, answers.get(i, False))
+        return [self.link_cache.get(link) or False for link in links]
+        
+    async def _already_stored(self, team_id: str, url: str) -> bool:
+        """Whether the team already has url; the bloom filter rules most links out, a hit is checked on the index"""
+        if _scraped_key(team_id, url) not in scraped_urls:
+            return False
+        try:
+            stored = await db.scraped_content.find_one(
+                {"team_id": team_id, "source_url": _canonicalize_url(url)}, {"_id": 0, "source_url": 1}
+            )
+        except Exception as e:
+            logging.warning(f"Failed to check whether {url} is already stored: {e}")
+            # Scraping it again is harmless, the bulk save replaces the team's existing row
+            return False
+        return stored is not None
+
+    async def _scrape_one_safe(self, link: str, team_id: str, user_id: Optional[str],
+                               semaphore: asyncio.Semaphore,
+                               collect_links: bool = False) -> Tuple[Optional[ScrapedContent], List[str]]:
+        """
+        Scrape one discovered link under the bulk concurrency limit, logging failures instead of raising.
+        With collect_links the page's own links are returned too so the crawl can go a level deeper.
+        """
+        match = _RE_CONTENT_TYPE.search(link)
+        content_type = _CONTENT_TYPE_BY_KEYWORD[match.group(1).lower()] if match else "blog"
+        async with semaphore:
             try:
-                downloaded = trafilatura.fetch_url(url)
-                if downloaded:
-                    text = trafilatura.extract(downloaded, include_comments=False, include_tables=True)
-                    if text and len(text.strip()) > 50:
-                        word_count = len(text.split())
-                        if word_count > best_word_count:
-                            metadata = trafilatura.extract_metadata(downloaded)
-                            title = metadata.title if metadata and metadata.title else self._extract_title_from_url(url)
-                            author = metadata.author if metadata and metadata.author else None
-                            best_content = {
-                                "title": title,
-                                "content": text,
-                                "author": author,
-                                "method": "trafilatura",
-                                "word_count": word_count
-                            }
-                            best_word_count = word_count
-                        extraction_methods_tried.append("trafilatura")
-                        logging.info(f"Trafilatura extracted {word_count} words from {url}")
+                html = None
+                validators = None
+                # Without links to collect, scrape_url fetches the page itself and can revalidate a stored copy
+                if collect_links:
+                    try:
+                        html, validators = await self._fetch_page(link)
+                    except Exception as e:
+                        logging.warning(f"Failed to fetch {link}: {e}")
+                        # An empty page sends scrape_url straight to its Gemini fallback instead of refetching
+                        html = ""
+                content = await self.scrape_url(link, team_id, user_id, content_type, html=html, validators=validators)
+                page_links = []
+                if collect_links and html:
+                    page_links = await asyncio.get_running_loop().run_in_executor(None, self._collect_links, html, link)
+                return content, page_links
             except Exception as e:
-                logging.warning(f"Trafilatura failed for {url}: {e}")
-            # Method 3: Try requests + readability with advanced headers
+                logging.warning(f"Failed to scrape discovered link {link}: {e}")
+                return None, []
+
+    async def _fetch_html(self, url: str) -> str:
+        """
+        Download a page once so every extractor can work from the same HTML, retrying transient failures
+        """
+        html, _ = await self._fetch_page(url)
+        return html
+
+    async def _fetch_page(self, url: str, validators: Optional[Dict[str, Optional[str]]] = None
+                          ) -> Tuple[Optional[str], Dict[str, Optional[str]]]:
+        """
+        _fetch_html that also returns the page's etag/last_modified validators.
+        Given the validators of a stored copy, the request is conditional and html is None when the page is unchanged.
+        """
+        headers = {'Referer': url}
+        if validators:
+            if validators.get("etag"):
+                headers['If-None-Match'] = validators["etag"]
+            if validators.get("last_modified"):
+                headers['If-Modified-Since'] = validators["last_modified"]
+        for attempt in range(FETCH_RETRIES + 1):
             try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
-                    'Accept-Language': 'en-US,en;q=0.9',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Referer': url,
-                    'DNT': '1',
-                    'Upgrade-Insecure-Requests': '1',
-                }
-                response = requests.get(url, timeout=30, headers=headers)
-                response.raise_for_status()
-                doc = Document(response.text)
-                title = doc.title()
-                content_html = doc.summary()
-                if content_html and len(content_html.strip()) > 50:
-                    content_text = self.h.handle(content_html)
-                    content_text = self._clean_markdown(content_text)
-                    word_count = len(content_text.split())
-                    if word_count > best_word_count:
-                        best_content = {
-                            "title": title or self._extract_title_from_url(url),
-                            "content": content_text,
-                            "author": None,
-                            "method": "readability",
-                            "word_count": word_count
-                        }
-                        best_word_count = word_count
-                    extraction_methods_tried.append("readability")
-                    logging.info(f"Readability extracted {word_count} words from {url}")
+                return await self._fetch_page_once(url, headers)
+            except aiohttp.ClientResponseError as e:
+                if e.status not in FETCH_RETRY_STATUSES or attempt == FETCH_RETRIES:
+                    raise
+            except aiohttp.ClientConnectionError:
+                if attempt == FETCH_RETRIES:
+                    raise
+            await asyncio.sleep(FETCH_RETRY_BACKOFF * (2 ** attempt))
+
+    async def _fetch_page_once(self, url: str, headers: Dict[str, str]) -> Tuple[Optional[str], Dict[str, Optional[str]]]:
+        # Spacing is taken right before the request goes out, so nothing queued after the wait can bunch requests up
+        await self.host_limiter.wait(urlparse(url).netloc)
+        async with http_session.get(url, headers=headers) as response:
+            response.raise_for_status()
+            validators = {
+                "etag": response.headers.get('ETag'),
+                "last_modified": response.headers.get('Last-Modified'),
+            }
+            if response.status == 304:
+                return None, validators
+            if response.content_length and response.content_length > MAX_HTML_BYTES:
+                raise ValueError(f"Page too large ({response.content_length} bytes, max {MAX_HTML_BYTES})")
+            # Stream the body so oversized pages without a Content-Length are cut off early
+            chunks = []
+            total = 0
+            async for chunk in response.content.iter_chunked(65536):
+                total += len(chunk)
+                if total > MAX_HTML_BYTES:
+                    raise ValueError(f"Page too large (over {MAX_HTML_BYTES} bytes)")
+                chunks.append(chunk)
+            return _decode_html(b''.join(chunks), response.charset), validators
+
+    def _extract_with_resiliparse(self, html: str, url: str) -> Optional[Dict[str, Any]]:
+        """Extract the main content from already-downloaded HTML with resiliparse"""
+        tree = HTMLTree.parse(html)
+        text = extract_plain_text(tree, main_content=True)
+        if not text or len(text.strip()) <= 100:
+            return None
+        return {
+            "title": tree.title or self._extract_title_from_url(url),
+            "content": text,
+            "author": None,
+            "method": "resiliparse",
+            "word_count": len(text.split())
+        }
+
+    def _extract_with_newspaper(self, html: str, url: str) -> Optional[Dict[str, Any]]:
+        """Parse already-downloaded HTML with newspaper3k"""
+        from newspaper import Article
+        # fetch_images would make parse() download candidate top images over blocking HTTP
+        article = Article(url, fetch_images=False)
+        article.set_html(html)
+        article.parse()
+        if not article.text or len(article.text.strip()) <= 50:
+            return None
+        return {
+            "title": article.title or self._extract_title_from_url(url),
+            "content": article.text,
+            "author": ", ".join(article.authors) if article.authors else None,
+            "method": "newspaper3k",
+            "word_count": len(article.text.split())
+        }
+
+    def _extract_with_trafilatura(self, html: str, url: str) -> Optional[Dict[str, Any]]:
+        """Parse already-downloaded HTML with trafilatura"""
+        # JSON output carries text and metadata from one parse, no separate extract_metadata pass
+        extracted = trafilatura.extract(html, output_format='json', with_metadata=True,
+                                        include_comments=False, include_tables=True)
+        if not extracted:
+            return None
+        result = orjson.loads(extracted)
+        text = result.get("text")
+        if not text or len(text.strip()) <= 50:
+            return None
+        return {
+            "title": result.get("title") or self._extract_title_from_url(url),
+            "content": text,
+            "author": result.get("author"),
+            "method": "trafilatura",
+            "word_count": len(text.split())
+        }
+
+    def _extract_with_readability(self, html: str, url: str) -> Optional[Dict[str, Any]]:
+        """Extract markdown from already-downloaded HTML, using readability for the title and fallback summary"""
+        doc = Document(html)
+        title = doc.title()
+        # Trafilatura emits markdown in one pass; markdownify over the readability summary is the last resort
+        content_text = trafilatura.extract(html, output_format='markdown', include_comments=False, include_tables=True)
+        if not content_text:
+            content_html = doc.summary()
+            if not content_html or len(content_html.strip()) <= 50:
+                return None
+            content_text = self._clean_markdown(_MARKDOWN_CONVERTER.convert(content_html))
+        return {
+            "title": title or self._extract_title_from_url(url),
+            "content": content_text,
+            "author": None,
+            "method": "readability",
+            "word_count": len(content_text.split())
+        }
+
+    async def scrape_url(self, url: str, team_id: str, user_id: Optional[str] = None, content_type: str = "blog",
+                         html: Optional[str] = None,
+                         validators: Optional[Dict[str, Optional[str]]] = None) -> ScrapedContent:
+        """
+        Scrape content from a URL using multiple methods for best results, enhanced with Gemini AI.
+        Pass html when the page has already been downloaded to skip fetching it again, with the validators that fetch returned.
+        """
+        try:
+            # Rows are stored under the canonical URL so lookups match the bloom filter's keys
+            source_url = _canonicalize_url(url)
+            cache_key = (source_url, content_type)
+            cached = self.scrape_cache.get(cache_key)
+            if cached:
+                logging.info(f"Using cached extraction for {url}")
+                return ScrapedContent(**cached, source_url=source_url, user_id=user_id, team_id=team_id)
+            best_content = None
+            best_word_count = 0
+            extraction_methods_tried = []
+            validators = validators or {"etag": None, "last_modified": None}
+            # Methods 0-3: fetch the page once and run the extractors concurrently on the same HTML
+            try:
+                if html is None:
+                    # Revalidate the team's stored copy; an unchanged page skips the download and every extractor
+                    stored = await self._stored_copy(source_url, team_id)
+                    html, validators = await self._fetch_page(url, stored)
+                    if html is None and stored:
+                        logging.info(f"{url} not modified since it was stored, reusing the stored extraction")
+                        extracted = {key: stored.get(key) for key in _STORED_EXTRACTION_FIELDS}
+                        # Keep the stored classification; the requested type only fills in a row that has none
+                        if not extracted.get("content_type"):
+                            extracted["content_type"] = content_type
+                        self.scrape_cache.put(cache_key, extracted)
+                        return ScrapedContent(**extracted, source_url=source_url, user_id=user_id, team_id=team_id)
+                # Resiliparse is fast enough to try on its own; the slower extractors only run if it comes up short.
+                # Within a stage, extractors are ordered by preference so ties on word count go to the earlier one.
+                stages = [
+                    [("resiliparse", "_extract_with_resiliparse")],
+                    [
+                        ("trafilatura", "_extract_with_trafilatura"),
+                        ("readability", "_extract_with_readability"),
+                        ("newspaper3k", "_extract_with_newspaper"),
+                    ],
+                ]
+                for extractors in stages:
+                    results = await asyncio.gather(
+                        *(html_pool.run(_run_extractor, extractor, html, url) for _, extractor in extractors),
+                        return_exceptions=True
+                    )
+                    for (method, _), result in zip(extractors, results):
+                        if isinstance(result, Exception):
+                            logging.warning(f"{method} failed for {url}: {result}")
+                            continue
+                        if not result:
+                            continue
+                        extraction_methods_tried.append(method)
+                        logging.info(f"{method} extracted {result['word_count']} words from {url}")
+                        if result["word_count"] > best_word_count:
+                            best_content = result
+                            best_word_count = result["word_count"]
+                    # Stop once a stage yields enough text to skip the Gemini fallback below
+                    if best_word_count >= MIN_EXTRACTED_WORDS:
+                        break
             except Exception as e:
-                logging.warning(f"Readability method failed for {url}: {e}")
-            # Method 4: Gemini AI Fallback (if other methods failed or returned poor results)
-            if (not best_content or best_word_count < 100) and self.gemini_model:
+                logging.warning(f"Failed to fetch {url}: {e}")
+            # Method 4: Gemini AI Fallback (if other methods failed, or came up short on a page with more to it)
+            poor_extraction = (best_word_count < MIN_EXTRACTED_WORDS
+                               and len(html or "") > GEMINI_FALLBACK_MIN_HTML_CHARS)
+            if (not best_content or poor_extraction) and self.gemini_model:
                 try:
                     # Try Gemini with a direct fetch prompt
-                    prompt = f"""
-                    Fetch the content from the following URL and extract the main article, blog post, or guide. Return the result as JSON with keys: title, content (markdown), author (if found), and category. If the page is not accessible, return an error message.
-                    URL: {url}
-                    """
-                    ai_response = self.gemini_model.generate_content(prompt)
+                    prompt = _DIRECT_FETCH_PROMPT.substitute(url=url)
+                    ai_response = await self.gemini_model.generate_content_async(prompt, generation_config=_ARTICLE_OUTPUT)
                     if ai_response and ai_response.text:
-                        import json
                         try:
-                            result = json.loads(ai_response.text.strip().split('\n')[0])
-                            if result.get("content"):
+                            result = _parse_gemini_json(ai_response.text)
+                            if result and result.get("content"):
                                 best_content = {
                                     "title": result.get("title") or self._extract_title_from_url(url),
                                     "content": result["content"],
@@ -537,188 +1043,258 @@ class ContentScraper:
             if not best_content:
                 raise Exception(f"All extraction methods failed. Tried: {', '.join(extraction_methods_tried)}")
             # Enhance content with Gemini if available and content is decent
-            enhanced_result = self._enhance_content_with_gemini(best_content["content"], url)
+            enhanced_result = await self._enhance_content_with_gemini(best_content["content"], url)
             if enhanced_result.get("enhanced"):
                 final_content = enhanced_result.get("content", best_content["content"])
                 final_title = enhanced_result.get("title") or best_content["title"]
                 final_author = enhanced_result.get("author") or best_content["author"]
                 final_content_type = enhanced_result.get("category", content_type)
                 extraction_method = f"{best_content['method']}+gemini"
+                # Gemini already returned markdown, so it only needs counting
+                final_word_count = len(final_content.split())
             else:
-                final_content = self._clean_and_convert_to_markdown(best_content["content"])
+                final_content, final_word_count = self._markdown_with_word_count(best_content["content"])
                 final_title = best_content["title"]
                 final_author = best_content["author"]
                 final_content_type = content_type
                 extraction_method = best_content["method"]
-            final_word_count = len(final_content.split())
             logging.info(f"Final extraction: {final_word_count} words via {extraction_method}")
-            return ScrapedContent(
-                title=final_title,
-                content=final_content,
-                content_type=final_content_type,
-                source_url=url,
-                author=final_author,
-                user_id=user_id,
-                team_id=team_id,
-                word_count=final_word_count,
-                extraction_method=extraction_method
-            )
+            extracted = {
+                "title": final_title,
+                "content": final_content,
+                "content_type": final_content_type,
+                "author": final_author,
+                "word_count": final_word_count,
+                "extraction_method": extraction_method,
+                **validators,
+            }
+            self.scrape_cache.put(cache_key, extracted)
+            return ScrapedContent(**extracted, source_url=source_url, user_id=user_id, team_id=team_id)
         except Exception as e:
             logging.error(f"Failed to scrape {url}: {e}")
             raise HTTPException(status_code=400, detail=f"Failed to scrape content from URL: {str(e)}")
     
-    async def scrape_pdf(self, file_content: bytes, filename: str, team_id: str, user_id: str = None) -> List[Dict]:
-        """Extract text from PDF, split into logical chunks, and return as a list of markdown items."""
+    async def _stored_copy(self, url: str, team_id: str) -> Optional[Dict[str, Any]]:
+        """The team's newest stored extraction of url that carries HTTP validators, if any"""
+        try:
+            return await db.scraped_content.find_one(
+                {"team_id": team_id, "source_url": _canonicalize_url(url),
+                 "$or": [{"etag": {"$ne": None}}, {"last_modified": {"$ne": None}}]},
+                {"_id": 0, **{key: 1 for key in _STORED_EXTRACTION_FIELDS}},
+                sort=[("created_at", -1)],
+            )
+        except Exception as e:
+            logging.warning(f"Failed to look up stored copy of {url}: {e}")
+            return None
+
+    async def scrape_pdf(self, file_path: str, filename: str, team_id: str, user_id: str = None) -> List[Dict]:
+        """Extract text from the PDF at file_path, split into logical chunks, and return as a list of markdown items."""
+        try:
+            # PDF parsing is CPU-bound, so run it in worker processes to keep the event loop free
+            page_count, outline = await pdf_pool.run(_read_pdf_layout, file_path)
+            if page_count < PDF_SHARD_MIN_PAGES:
+                return await pdf_pool.run(_extract_pdf_items, file_path, filename, user_id)
+
+            # Large documents: each worker reopens the file and extracts a contiguous page range
+            shard_count = os.cpu_count() or 1
+            shard_size = max(PDF_SHARD_SIZE_FLOOR, -(-page_count // shard_count))
+            shards = await asyncio.gather(*(
+                pdf_pool.run(_read_pdf_pages, file_path, start, min(start + shard_size, page_count))
+                for start in range(0, page_count, shard_size)
+            ))
+            pages = [text for shard in shards for text in shard]
+            return await pdf_pool.run(_chunk_pdf_pages, pages, outline, filename, user_id)
+        except Exception as e:
+            logging.error(f"Failed to scrape PDF {filename}: {e}")
+            return []
+
+    def _read_pdf_layout(self, file_path: str) -> Tuple[int, List]:
+        """Page count and PyMuPDF outline, read up front so scrape_pdf can plan its shards"""
+        import fitz
+        with fitz.open(file_path, filetype="pdf") as pdf:
+            return pdf.page_count, pdf.get_toc()
+
+    def _read_pdf_pages(self, file_path: str, start_page: int, end_page: int) -> List[str]:
+        """Plain text of pages [start_page, end_page), extracted by one shard worker"""
+        import fitz
+        with fitz.open(file_path, filetype="pdf") as pdf:
+            return [pdf[i].get_text("text") for i in range(start_page, end_page)]
+
+    def _extract_pdf_items(self, file_path: str, filename: str, user_id: str = None) -> List[Dict]:
+        """Synchronous PDF chunking used by scrape_pdf inside the process pool."""
+        import fitz
+        try:
+            # Opening from a path lets MuPDF read pages on demand rather than holding the file in memory
+            with fitz.open(file_path, filetype="pdf") as pdf:
+                # Extract every page once; the chunking strategies all reuse this list
+                pages = [page.get_text("text") for page in pdf]
+                outline = pdf.get_toc()
+        except Exception as e:
+            logging.error(f"Failed to scrape PDF {filename}: {e}")
+            return []
+        return self._chunk_pdf_pages(pages, outline, filename, user_id)
+
+    def _chunk_pdf_pages(self, pages: List[str], outline: List, filename: str, user_id: str = None) -> List[Dict]:
+        """Split extracted page texts into markdown items by outline, printed TOC, headings, or size"""
         items = []
         try:
-            with pdfplumber.open(io.BytesIO(file_content)) as pdf:
-                # 1. Try to detect TOC and chunk by it
-                toc = self._detect_toc(pdf)
-                if toc:
-                    for i, (title, start_page) in enumerate(toc):
-                        end_page = toc[i+1][1] if i+1 < len(toc) else len(pdf.pages)
-                        content = self._extract_text_range(pdf, start_page, end_page)
-                        if len(content.strip()) > 50:
-                            items.append({
-                                "title": title,
-                                "content": self._clean_and_convert_to_markdown(content),
-                                "content_type": "book",
-                                "source_url": filename,
-                                "author": "",
-                                "user_id": user_id or ""
-                            })
-                    if items:
-                        return items
-                # 2. Try to chunk by headings
-                heading_chunks = self._chunk_by_headings(pdf)
-                if len(heading_chunks) >= 3:
-                    for i, (title, content, page_range) in enumerate(heading_chunks):
-                        if len(content.strip()) > 50:
-                            items.append({
-                                "title": title or f"Section {i+1} (pages {page_range})",
-                                "content": self._clean_and_convert_to_markdown(content),
-                                "content_type": "book",
-                                "source_url": filename,
-                                "author": "",
-                                "user_id": user_id or ""
-                            })
-                    if items:
-                        return items
-                # 3. Fallback: adaptive chunking by content size
-                adaptive_chunks = self._adaptive_chunking(pdf)
-                for i, (content, page_range) in enumerate(adaptive_chunks):
+            # 1. Try the PDF's own outline, then a TOC printed in the first pages, and chunk by it
+            toc = self._outline_toc(outline, len(pages)) or self._detect_toc(pages)
+            if toc:
+                for i, (title, start_page) in enumerate(toc):
+                    end_page = toc[i+1][1] if i+1 < len(toc) else len(pages)
+                    content = self._extract_text_range(pages, start_page, end_page)
+                    if len(content.strip()) > 50:
+                        items.append({
+                            "title": title,
+                            "content": self._clean_and_convert_to_markdown(content),
+                            "content_type": "book",
+                            "source_url": filename,
+                            "author": "",
+                            "user_id": user_id or ""
+                        })
+                if items:
+                    return items
+            # 2. Try to chunk by headings
+            heading_chunks = self._chunk_by_headings(pages)
+            if len(heading_chunks) >= 3:
+                for i, (title, content, page_range) in enumerate(heading_chunks):
                     if len(content.strip()) > 50:
                         items.append({
-                            "title": f"Chunk {i+1} (pages {page_range})",
+                            "title": title or f"Section {i+1} (pages {page_range})",
                             "content": self._clean_and_convert_to_markdown(content),
                             "content_type": "book",
                             "source_url": filename,
                             "author": "",
                             "user_id": user_id or ""
                         })
+                if items:
+                    return items
+            # 3. Fallback: adaptive chunking by content size
+            adaptive_chunks = self._adaptive_chunking(pages)
+            for i, (content, page_range) in enumerate(adaptive_chunks):
+                if len(content.strip()) > 50:
+                    items.append({
+                        "title": f"Chunk {i+1} (pages {page_range})",
+                        "content": self._clean_and_convert_to_markdown(content),
+                        "content_type": "book",
+                        "source_url": filename,
+                        "author": "",
+                        "user_id": user_id or ""
+                    })
         except Exception as e:
             logging.error(f"Failed to scrape PDF {filename}: {e}")
         return items
 
-    def _detect_toc(self, pdf) -> List:
+    def _outline_toc(self, outline: List, page_count: int) -> List:
+        """Top-level bookmarks from PyMuPDF's get_toc() as (title, zero-based page) pairs"""
+        toc = [
+            (title.strip(), page - 1) for level, title, page in outline
+            if level == 1 and title.strip() and 0 < page <= page_count
+        ]
+        return sorted(toc, key=lambda x: x[1]) if len(toc) >= 3 else []
+
+    def _detect_toc(self, pages: List[str]) -> List:
         toc = []
-        toc_pattern = re.compile(r'([A-Z][\w\s\-:]+)\s+\.{2,}\s*(\d+)$')
-        for page_num in range(min(10, len(pdf.pages))):
-            text = pdf.pages[page_num].extract_text() or ""
-            for line in text.splitlines():
-                match = toc_pattern.match(line.strip())
-                if match:
-                    title = match.group(1).strip()
-                    page = int(match.group(2)) - 1
-                    if len(title) > 5 and 0 <= page < len(pdf.pages):
-                        toc.append((title, page))
+        for text in pages[:10]:
+            for match in _RE_TOC_ENTRY.finditer(text):
+                title = match.group(1).strip()
+                page = int(match.group(2)) - 1
+                if len(title) > 5 and 0 <= page < len(pages):
+                    toc.append((title, page))
         return sorted(toc, key=lambda x: x[1]) if len(toc) >= 3 else []
 
-    def _extract_text_range(self, pdf, start_page: int, end_page: int) -> str:
-        content = ""
-        for i in range(start_page, min(end_page, len(pdf.pages))):
-            page_text = pdf.pages[i].extract_text() or ""
-            content += page_text + "\n"
-        return content
+    def _extract_text_range(self, pages: List[str], start_page: int, end_page: int) -> str:
+        parts = pages[start_page:end_page]
+        return "\n".join(parts) + "\n" if parts else ""
 
-    def _chunk_by_headings(self, pdf) -> List:
+    def _chunk_by_headings(self, pages: List[str]) -> List:
         chunks = []
         current_title = None
-        current_content = ""
+        current_parts = []
         start_page = 0
-        for i, page in enumerate(pdf.pages):
-            text = page.extract_text() or ""
-            lines = text.splitlines()
-            found_heading = False
-            for line in lines:
+        for i, text in enumerate(pages):
+            for line in text.splitlines():
                 line = line.strip()
-                if (line.isupper() and len(line) > 5) or re.match(r'^\d+\.\s+[A-Z]', line):
-                    if current_content.strip():
-                        chunks.append((current_title, current_content.strip(), f"{start_page+1}-{i}"))
+                # Numbered headings start with a digit, so most lines never reach the regex
+                if (line.isupper() and len(line) > 5) or (line[:1].isdigit() and _RE_NUMBERED_HEADING.match(line)):
+                    current_content = "\n".join(current_parts).strip()
+                    if current_content:
+                        chunks.append((current_title, current_content, f"{start_page+1}-{i}"))
                     current_title = line
-                    current_content = ""
+                    current_parts = []
                     start_page = i
-                    found_heading = True
                     break
-            if not found_heading:
-                current_content += text + "\n"
-        if current_content.strip():
-            chunks.append((current_title, current_content.strip(), f"{start_page+1}-{len(pdf.pages)}"))
+            # The page that opens a section belongs to it, so its text is kept either way
+            current_parts.append(text)
+        current_content = "\n".join(current_parts).strip()
+        if current_content:
+            chunks.append((current_title, current_content, f"{start_page+1}-{len(pages)}"))
         return chunks
 
-    def _adaptive_chunking(self, pdf, target_chunk_size=8000) -> List:
+    def _adaptive_chunking(self, pages: List[str], target_chunk_size=8000) -> List:
         chunks = []
-        current_content = ""
+        current_parts = []
+        current_len = 0  # length the joined chunk would have, including page separators
         start_page = 0
-        for i, page in enumerate(pdf.pages):
-            text = page.extract_text() or ""
-            current_content += text + "\n"
-            if len(current_content) > target_chunk_size:
-                chunks.append((current_content.strip(), f"{start_page+1}-{i+1}"))
-                current_content = ""
+        for i, text in enumerate(pages):
+            part = 0
+            # A page that would push the chunk past twice the target is split, preferably at a line break,
+            # so no chunk grows far beyond what downstream consumers expect
+            while current_len + len(text) + 1 > 2 * target_chunk_size:
+                split_at = target_chunk_size - current_len
+                line_break = text.rfind("\n", 0, split_at)
+                if line_break > 0:
+                    split_at = line_break
+                part += 1
+                current_parts.append(text[:split_at])
+                chunks.append(("\n".join(current_parts).strip(), f"{start_page+1}-{i+1}.{part}"))
+                text = text[split_at:]
+                current_parts = []
+                current_len = 0
+                start_page = i
+            current_parts.append(text)
+            current_len += len(text) + 1
+            if current_len > target_chunk_size:
+                page_range = f"{start_page+1}-{i+1}.{part+1}" if part else f"{start_page+1}-{i+1}"
+                chunks.append(("\n".join(current_parts).strip(), page_range))
+                current_parts = []
+                current_len = 0
                 start_page = i + 1
-        if current_content.strip():
-            chunks.append((current_content.strip(), f"{start_page+1}-{len(pdf.pages)}"))
+        current_content = "\n".join(current_parts).strip()
+        if current_content:
+            chunks.append((current_content, f"{start_page+1}-{len(pages)}"))
         return chunks
     
     def _clean_and_convert_to_markdown(self, text: str) -> str:
         """Clean and convert text to markdown format"""
-        # Basic cleaning
-        text = text.strip()
-        
-        # Remove excessive whitespace
-        text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
-        text = re.sub(r'[ \t]+', ' ', text)
-        
-        # Convert to markdown-like format
-        lines = text.split('\n')
-        processed_lines = []
+        return self._markdown_with_word_count(text)[0]
+    
+    def _markdown_with_word_count(self, text: str) -> Tuple[str, int]:
+        """Clean and convert text to markdown, counting words in the same pass"""
+        # Remove excessive blank lines
+        text = _RE_TRIPLE_NL.sub('\n\n', text.strip())
         
-        for line in lines:
-            line = line.strip()
+        # One visit per line: collapse its space/tab runs, trim it, apply the header heuristic and count the result's words
+        word_count = 0
+        def format_line(match: re.Match) -> str:
+            nonlocal word_count
+            line = _RE_WS.sub(' ', match.group(0)).strip()
             if not line:
-                processed_lines.append('')
-                continue
-                
-            # Detect headers (simple heuristic)
-            if len(line) < 100 and line.isupper():
-                processed_lines.append(f"## {line.title()}")
-            elif len(line) < 80 and not line.endswith('.') and not line.endswith(',') and not line.endswith(';'):
-                # Possible header
-                processed_lines.append(f"### {line}")
-            else:
-                processed_lines.append(line)
-        
-        return '\n'.join(processed_lines)
+                return ''
+            line = _format_markdown_line(line)
+            word_count += len(line.split())
+            return line
+        return _RE_LINE.sub(format_line, text), word_count
     
     def _clean_markdown(self, markdown_text: str) -> str:
         """Clean markdown text"""
         # Remove excessive whitespace
-        markdown_text = re.sub(r'\n\s*\n\s*\n', '\n\n', markdown_text)
-        markdown_text = re.sub(r'[ \t]+', ' ', markdown_text)
+        markdown_text = _RE_TRIPLE_NL.sub('\n\n', markdown_text)
+        markdown_text = _RE_WS.sub(' ', markdown_text)
         
         # Remove empty links
-        markdown_text = re.sub(r'\[\]\([^)]*\)', '', markdown_text)
+        markdown_text = _RE_EMPTY_LINK.sub('', markdown_text)
         
         return markdown_text.strip()
     
@@ -733,6 +1309,30 @@ class ContentScraper:
 
 # Initialize scraper
 scraper = ContentScraper()
+# A re-scrape of a page the team already has updates that row; the unique index on these fields backs this up
+content_writer = ScrapedContentWriter(db.scraped_content, upsert_on=("team_id", "source_url"))
+
+
+def _extract_pdf_items(file_path: str, filename: str, user_id: str = None) -> List[Dict]:
+    """Module-level entry point so the process pool can pickle the call."""
+    return scraper._extract_pdf_items(file_path, filename, user_id)
+
+
+def _read_pdf_layout(file_path: str) -> Tuple[int, List]:
+    return scraper._read_pdf_layout(file_path)
+
+
+def _read_pdf_pages(file_path: str, start_page: int, end_page: int) -> List[str]:
+    return scraper._read_pdf_pages(file_path, start_page, end_page)
+
+
+def _chunk_pdf_pages(pages: List[str], outline: List, filename: str, user_id: str = None) -> List[Dict]:
+    return scraper._chunk_pdf_pages(pages, outline, filename, user_id)
+
+
+def _run_extractor(method: str, html: str, url: str) -> Optional[Dict[str, Any]]:
+    """Run one of the scraper's _extract_with_* methods by name inside the process pool."""
+    return getattr(scraper, method)(html, url)
 
 
 # Original routes
@@ -742,15 +1342,14 @@ async def root():
 
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
-    status_dict = input.dict()
-    status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    status_obj = StatusCheck(client_name=input.client_name)
+    _ = await db.status_checks.insert_one(status_obj.model_dump())
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+    # Rows were validated when they were saved, so send them as stored instead of through response_model
+    return ORJSONResponse(await db.status_checks.find({}, {"_id": 0}).to_list(1000))
 
 
 # New scraping routes
@@ -798,8 +1397,9 @@ async def scrape_url_endpoint(request: ScrapeUrlRequest):
             content_type=request.content_type
         )
         
-        # Save to database
-        await db.scraped_content.insert_one(scraped_content.dict())
+        # Queue for a batched database write; a page the team already has keeps its stored id
+        await scraper._reuse_stored_ids(request.team_id, [scraped_content])
+        await content_writer.put(scraped_content.model_dump())
         
         return ScrapeResponse(
             success=True,
@@ -821,6 +1421,39 @@ async def scrape_url_endpoint(request: ScrapeUrlRequest):
         )
 
 
+def _copy_upload_capped(src, dst, limit: int) -> bool:
+    """Copy src to dst in chunks; returns False as soon as more than limit bytes have been read"""
+    written = 0
+    while chunk := src.read(UPLOAD_READ_CHUNK):
+        written += len(chunk)
+        if written > limit:
+            return False
+        dst.write(chunk)
+    return True
+
+
+async def _spool_upload_capped(file: UploadFile, limit: int) -> str:
+    """
+    Copy an upload to a temporary file in chunks, rejecting it as soon as it grows past limit bytes.
+    Returns the temp file path; the caller removes it.
+    """
+    too_large = HTTPException(status_code=413, detail=f"File too large (max {limit // (1024 * 1024)}MB)")
+    if file.size is not None and file.size > limit:
+        raise too_large
+    loop = asyncio.get_running_loop()
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
+        try:
+            # Starlette has already spooled the body; copy it in one worker thread rather than
+            # a thread hop per chunk read plus blocking disk writes on the event loop
+            if not await loop.run_in_executor(None, _copy_upload_capped, file.file, tmp, limit):
+                raise too_large
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+    return tmp.name
+
+
 @api_router.post("/scrape-pdf")
 async def scrape_pdf_endpoint(
     team_id: str = Form(...),
@@ -833,15 +1466,17 @@ async def scrape_pdf_endpoint(
     try:
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are supported")
-        file_content = await file.read()
-        if len(file_content) > 50 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="File too large (max 50MB)")
-        items = await scraper.scrape_pdf(
-            file_content=file_content,
-            filename=file.filename,
-            team_id=team_id,
-            user_id=user_id
-        )
+        # Workers open the PDF from disk instead of receiving the whole upload pickled through the pool
+        pdf_path = await _spool_upload_capped(file, MAX_PDF_BYTES)
+        try:
+            items = await scraper.scrape_pdf(
+                file_path=pdf_path,
+                filename=file.filename,
+                team_id=team_id,
+                user_id=user_id
+            )
+        finally:
+            os.remove(pdf_path)
         return { 'success': True, 'message': 'PDF content extracted and chunked successfully', 'items': items }
     except HTTPException as e:
         return { 'success': False, 'message': str(e.detail), 'items': [] }
@@ -849,23 +1484,82 @@ async def scrape_pdf_endpoint(
         return { 'success': False, 'message': f"Unexpected error: {str(e)}", 'items': [] }
 
 
-@api_router.get("/knowledge-base", response_model=List[ScrapedContent])
-async def get_knowledge_base(team_id: str, user_id: Optional[str] = None):
+def _knowledge_base_projection(include_content: bool, fields: Optional[str], preview_chars: Optional[int] = None) -> Dict[str, Any]:
     """
-    Get all scraped content for a team/user
+    Build the Mongo projection for a listing; fields is a comma-separated list of ScrapedContent fields,
+    preview_chars cuts content down to its first characters inside Mongo
+    """
+    if preview_chars is not None and preview_chars < 1:
+        raise HTTPException(status_code=400, detail="preview_chars must be at least 1")
+    if fields:
+        requested = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in requested if f not in ScrapedContent.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        projection = {f: 1 for f in requested}
+    else:
+        # Listing the model's fields keeps raw rows shaped like ScrapedContentSummary without validating them,
+        # and lets a content preview be computed alongside them
+        projection = {f: 1 for f in ScrapedContentSummary.model_fields if include_content or f != "content"}
+    if preview_chars and "content" in projection:
+        projection["content"] = {"$substrCP": ["$content", 0, preview_chars]}
+    projection["_id"] = 0
+    return projection
+
+
+async def _stream_ndjson(cursor):
+    """Yield one JSON line per document as the cursor produces them"""
+    async for doc in cursor:
+        yield orjson.dumps(doc) + b"\n"
+
+
+@api_router.get("/knowledge-base", response_model=List[ScrapedContentSummary])
+async def get_knowledge_base(team_id: str, user_id: Optional[str] = None, include_content: bool = True,
+                             fields: Optional[str] = None, stream: bool = False, preview_chars: Optional[int] = None):
+    """
+    Get all scraped content for a team/user. Pass include_content=false to skip the markdown bodies,
+    fields=id,title,... to return only those fields, preview_chars=N to get only the start of each body,
+    and stream=true to receive NDJSON rows.
     """
     try:
         query = {"team_id": team_id}
         if user_id:
             query["user_id"] = user_id
         
-        content_list = await db.scraped_content.find(query).sort("created_at", -1).to_list(1000)
-        return [ScrapedContent(**content) for content in content_list]
+        projection = _knowledge_base_projection(include_content, fields, preview_chars)
+        cursor = db.scraped_content.find(query, projection).sort("created_at", -1).limit(KNOWLEDGE_BASE_LIMIT)
+        
+        if stream:
+            return StreamingResponse(_stream_ndjson(cursor), media_type="application/x-ndjson")
+        
+        # Rows were validated when they were saved, so send them as stored instead of through response_model
+        return ORJSONResponse(await cursor.to_list(KNOWLEDGE_BASE_LIMIT))
     
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch knowledge base: {str(e)}")
 
 
+@api_router.get("/knowledge-base/{content_id}", response_model=ScrapedContent)
+async def get_content(content_id: str, team_id: str):
+    """
+    Get a single piece of content including its full markdown
+    """
+    try:
+        content = await db.scraped_content.find_one({"id": content_id, "team_id": team_id}, {"_id": 0})
+        
+        if not content:
+            raise HTTPException(status_code=404, detail="Content not found")
+        
+        return content
+    
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch content: {str(e)}")
+
+
 @api_router.delete("/knowledge-base/{content_id}")
 async def delete_content(content_id: str, team_id: str):
     """
@@ -890,9 +1584,6 @@ async def scrapy_crawl_endpoint(url: str, max_links: int = 10):
     """
     Run the Scrapy Gemini spider on the given URL and return the results as JSON.
     """
-    import tempfile
-    import os
-    import json
     # Create a temporary file for output
     with tempfile.NamedTemporaryFile(delete=False, suffix='.json') as tmpfile:
         output_path = tmpfile.name
@@ -901,20 +1592,38 @@ async def scrapy_crawl_endpoint(url: str, max_links: int = 10):
         "scrapy", "crawl", "gemini_spider",
         "-a", f"start_url={url}",
         "-a", f"max_links={max_links}",
-        "-o", output_path
+        "-o", output_path,
+        # DEBUG logs every request and scraped item, which slows the crawl down noticeably;
+        # the telnet console is never used here and only costs a listening port per run
+        "-s", "LOG_LEVEL=INFO",
+        "-s", "TELNETCONSOLE_ENABLED=False",
     ]
-    # Run the Scrapy spider as a subprocess
-    proc = subprocess.run(scrapy_cmd, cwd="./gemini_crawler", capture_output=True, text=True)
-    # Read the output JSON
+    # Run the Scrapy spider as a subprocess without blocking the event loop for the whole crawl
     try:
-        with open(output_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
-        data = []
-    # Clean up the temp file
-    os.remove(output_path)
-    # Optionally, include Scrapy logs in the response for debugging
-    return {"results": data, "scrapy_stdout": proc.stdout, "scrapy_stderr": proc.stderr}
+        proc = await asyncio.create_subprocess_exec(
+            *scrapy_cmd, cwd="./gemini_crawler",
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await proc.communicate()
+        finally:
+            # The request was cancelled mid-crawl; don't leave the spider running
+            if proc.returncode is None:
+                proc.kill()
+        # Read the output JSON
+        try:
+            with open(output_path, "rb") as f:
+                data = orjson.loads(f.read())
+        except Exception:
+            data = []
+    finally:
+        # Clean up the temp file
+        os.remove(output_path)
+    return {
+        "results": data,
+        "scrapy_stdout": stdout.decode(errors="replace"),
+        "scrapy_stderr": stderr.decode(errors="replace"),
+    }
 
 
 # Include the router in the main app
@@ -935,6 +1644,74 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_indexes():
+    indexes = [
+        # Knowledge base listing: filter by team (and optionally user), newest first
+        ([("team_id", 1), ("created_at", -1)], {}),
+        ([("team_id", 1), ("user_id", 1), ("created_at", -1)], {}),
+        # Single-item lookup and delete
+        ([("team_id", 1), ("id", 1)], {"unique": True}),
+        # One row per page per team, which the scrape upserts key on; also read by load_scraped_urls
+        (_SCRAPED_URLS_INDEX, {"unique": True}),
+    ]
+    for keys, options in indexes:
+        try:
+            try:
+                await db.scraped_content.create_index(keys, **options)
+            except OperationFailure as e:
+                # IndexOptionsConflict / IndexKeySpecsConflict: an older build of this index has other options
+                if e.code not in (85, 86):
+                    raise
+                await db.scraped_content.drop_index(keys)
+                await db.scraped_content.create_index(keys, **options)
+        except Exception as e:
+            logger.warning(f"Failed to create MongoDB index {keys}: {e}")
+
+@app.on_event("startup")
+async def load_scraped_urls():
+    query = {"source_url": {"$regex": "^https?://"}}
+    projection = {"_id": 0, "team_id": 1, "source_url": 1}
+    # Hinting the (team_id, source_url) index makes this a covered scan that never loads documents;
+    # if that index could not be built, fall back to a collection scan
+    for hint in (_SCRAPED_URLS_INDEX, None):
+        try:
+            cursor = db.scraped_content.find(query, projection)
+            if hint:
+                cursor = cursor.hint(hint)
+            async for doc in cursor:
+                scraped_urls.add(_scraped_key(doc["team_id"], doc["source_url"]))
+            return
+        except Exception as e:
+            logger.warning(f"Failed to load already scraped URLs (index hint: {bool(hint)}): {e}")
+
+@app.on_event("startup")
+async def startup_http_session():
+    global http_session
+    # Pooled keep-alive connections so repeat fetches to the same host skip the TCP/TLS handshake,
+    # and resolved addresses are kept for a crawl's lifetime instead of aiohttp's default 10s
+    connector = aiohttp.TCPConnector(limit=100, limit_per_host=4, keepalive_timeout=30, ttl_dns_cache=300)
+    http_session = aiohttp.ClientSession(headers=DEFAULT_HEADERS, connector=connector,
+                                         timeout=aiohttp.ClientTimeout(total=30))
+
+@app.on_event("startup")
+async def startup_content_writer():
+    content_writer.start()
+
+@app.on_event("shutdown")
+async def shutdown_content_writer():
+    await content_writer.stop()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    client.close()
+
+@app.on_event("shutdown")
+async def shutdown_http_session():
+    if http_session:
+        await http_session.close()
+
+@app.on_event("shutdown")
+async def shutdown_worker_pools():
+    html_pool.shutdown()
+    pdf_pool.shutdown()
\ No newline at end of file
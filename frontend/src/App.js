@@ -165,7 +165,9 @@ const App = () => {
       const response = await axios.get(`${API}/knowledge-base`, {
         params: {
           team_id: teamId,
-          user_id: userId || null
+          user_id: userId || null,
+          // The list only shows truncateContent(item.content); one extra character keeps its ellipsis
+          preview_chars: 201
         }
       });
 
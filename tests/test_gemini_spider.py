@@ -0,0 +1,40 @@
+import pytest
+
+from gemini_crawler.spiders import gemini_spider
+from gemini_crawler.spiders.gemini_spider import _note_slugs, _url_pattern
+
+
+@pytest.fixture(autouse=True)
+def fresh_slugs():
+    gemini_spider._slugs_by_prefix.clear()
+    yield
+    gemini_spider._slugs_by_prefix.clear()
+
+
+def test_top_level_slugs_keep_their_own_pattern():
+    urls = ["https://example.com/about-us", "https://example.com/contact-us", "https://example.com/my-first-post"]
+    for url in urls:
+        _note_slugs(url)
+    assert len({_url_pattern(url) for url in urls}) == 3
+
+
+def test_slugs_under_a_shared_prefix_collapse_once_repeated():
+    urls = ["https://example.com/blog/first-post", "https://example.com/blog/second-post"]
+    for url in urls:
+        _note_slugs(url)
+    # Two slugs are not yet enough to call /blog/ a listing of posts
+    assert _url_pattern(urls[0]) != _url_pattern(urls[1])
+
+    _note_slugs("https://example.com/blog/third-post")
+    assert _url_pattern(urls[0]) == _url_pattern(urls[1]) == "example.com/blog/*"
+
+
+def test_collapsing_is_per_prefix():
+    for slug in ("a-b", "c-d", "e-f"):
+        _note_slugs(f"https://example.com/blog/{slug}")
+    assert _url_pattern("https://example.com/docs/getting-started") == "example.com/docs/getting-started"
+    assert _url_pattern("https://other.com/blog/a-b") == "other.com/blog/a-b"
+
+
+def test_digits_are_generalised():
+    assert _url_pattern("https://example.com/page/2") == _url_pattern("https://example.com/page/3")
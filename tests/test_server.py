@@ -0,0 +1,292 @@
+import asyncio
+import os
+import time
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+import server
+from server import (ContentScraper, HostRateLimiter, ScrapedContentWriter, WorkerPool,
+                    _canonicalize_url, _insert_many_logged, _scraped_key)
+
+
+class FakeCollection:
+    """Stands in for a Motor collection; failing holds the batch indexes a write reports as failed"""
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.written = []
+
+    async def insert_many(self, docs, ordered=True):
+        self._write(docs)
+
+    async def bulk_write(self, requests, ordered=True):
+        self._write([request._doc["$set"] for request in requests])
+
+    def _write(self, docs):
+        errors = [{"index": i, "errmsg": "duplicate key"} for i in range(len(docs)) if i in self.failing]
+        self.written.extend(doc for i, doc in enumerate(docs) if i not in self.failing)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+def _doc(team_id, n):
+    return {"id": str(n), "team_id": team_id, "source_url": f"https://example.com/post-{n}"}
+
+
+def _die_once(marker):
+    # The first call takes its worker down with it, breaking the pool
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return "recovered"
+
+
+# _canonicalize_url
+
+def test_canonicalize_url_ignores_case_default_port_tracking_and_fragment():
+    assert _canonicalize_url("HTTPS://Example.COM:443/Post?utm_source=x&id=1&fbclid=y#top") == \
+        "https://example.com/Post?id=1"
+
+
+def test_canonicalize_url_keeps_meaningful_differences():
+    assert _canonicalize_url("https://example.com") == "https://example.com/"
+    assert _canonicalize_url("http://example.com:8080/a?page=2") == "http://example.com:8080/a?page=2"
+
+
+# ScrapedContentWriter
+
+def test_writer_stop_writes_every_queued_doc_without_waiting_out_the_interval():
+    collection = FakeCollection()
+    writer = ScrapedContentWriter(collection, batch_size=100, flush_interval=30)
+
+    async def run():
+        writer.start()
+        for n in range(3):
+            await writer.put(_doc("writer-stop", n))
+        started = time.monotonic()
+        await writer.stop()
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 5
+    assert [doc["id"] for doc in collection.written] == ["0", "1", "2"]
+    assert writer.task.done()
+
+
+def test_writer_only_remembers_docs_that_were_saved():
+    team_id = "writer-partial"
+    docs = [_doc(team_id, n) for n in range(3)]
+    collection = FakeCollection(failing={1})
+    writer = ScrapedContentWriter(collection, batch_size=3, upsert_on=("team_id", "source_url"))
+
+    async def run():
+        writer.start()
+        for doc in docs:
+            await writer.put(doc)
+        await writer.stop()
+
+    asyncio.run(run())
+    assert _scraped_key(team_id, docs[0]["source_url"]) in server.scraped_urls
+    assert _scraped_key(team_id, docs[1]["source_url"]) not in server.scraped_urls
+    assert _scraped_key(team_id, docs[2]["source_url"]) in server.scraped_urls
+
+
+def test_insert_many_logged_returns_the_saved_docs_on_partial_failure():
+    docs = [_doc("insert-partial", n) for n in range(4)]
+    saved = asyncio.run(_insert_many_logged(FakeCollection(failing={0, 2}), docs, "test items"))
+    assert saved == [docs[1], docs[3]]
+
+
+def test_upsert_keeps_id_and_created_at_of_an_existing_row():
+    class Recorder(FakeCollection):
+        async def bulk_write(self, requests, ordered=True):
+            self.requests = requests
+
+    collection = Recorder()
+    doc = dict(_doc("upsert", 1), created_at="then")
+    asyncio.run(_insert_many_logged(collection, [doc], "test items", upsert_on=("team_id", "source_url")))
+    (request,) = collection.requests
+    assert request._filter == {"team_id": "upsert", "source_url": doc["source_url"]}
+    assert request._doc["$setOnInsert"] == {"id": "1", "created_at": "then"}
+    assert "id" not in request._doc["$set"]
+
+
+# WorkerPool
+
+def test_worker_pool_replaces_a_broken_pool_and_retries(tmp_path):
+    pool = WorkerPool(max_workers=1)
+    try:
+        broken = pool.executor
+        assert asyncio.run(pool.run(_die_once, str(tmp_path / "died"))) == "recovered"
+        assert pool.executor is not broken
+    finally:
+        pool.shutdown()
+
+
+# HostRateLimiter
+
+def test_host_limiter_spaces_requests_to_one_host_but_not_across_hosts():
+    limiter = HostRateLimiter(min_interval=0.1)
+
+    async def timed(*hosts):
+        started = asyncio.get_running_loop().time()
+        await asyncio.gather(*(limiter.wait(host) for host in hosts))
+        return asyncio.get_running_loop().time() - started
+
+    async def run():
+        return await timed("a", "a", "a"), await timed("b", "c", "d")
+
+    same_host, different_hosts = asyncio.run(run())
+    assert same_host >= 0.2
+    assert different_hosts < 0.1
+
+
+def test_host_limiter_forgets_idle_hosts():
+    limiter = HostRateLimiter(min_interval=0.05)
+
+    async def run():
+        for n in range(50):
+            await limiter.wait(f"host-{n}")
+        await asyncio.sleep(0.06)
+        await limiter.wait("fresh")
+
+    asyncio.run(run())
+    assert list(limiter.last_request) == ["fresh"]
+    assert list(limiter.locks) == ["fresh"]
+
+
+# ContentScraper
+
+@pytest.fixture
+def scraper():
+    return ContentScraper()
+
+
+def test_not_modified_page_reuses_the_stored_extraction(scraper, monkeypatch):
+    stored = {"title": "Stored", "content": "stored body", "content_type": "blog", "author": "A",
+              "word_count": 2, "extraction_method": "trafilatura", "etag": '"v1"', "last_modified": None}
+    requested = {}
+
+    async def stored_copy(url, team_id):
+        return stored
+
+    async def fetch_page(url, validators=None):
+        requested["validators"] = validators
+        return None, {"etag": '"v1"', "last_modified": None}
+
+    async def no_extraction(*args):
+        raise AssertionError("an unchanged page must not be extracted again")
+
+    monkeypatch.setattr(scraper, "_stored_copy", stored_copy)
+    monkeypatch.setattr(scraper, "_fetch_page", fetch_page)
+    monkeypatch.setattr(server.html_pool, "run", no_extraction)
+
+    content = asyncio.run(scraper.scrape_url("https://Example.com/post?utm_source=x", "team-304", content_type="blog"))
+    assert requested["validators"] is stored
+    assert (content.title, content.content, content.etag) == ("Stored", "stored body", '"v1"')
+    assert content.source_url == "https://example.com/post"
+
+
+def test_not_modified_page_keeps_the_stored_content_type(scraper, monkeypatch):
+    rows = {"team-guide": {"content_type": "guide"}, "team-untyped": {"content_type": None}}
+
+    async def stored_copy(url, team_id):
+        return dict(rows[team_id], title="Stored", content="body", author="", word_count=1,
+                    extraction_method="trafilatura", etag='"v1"', last_modified=None)
+
+    async def fetch_page(url, validators=None):
+        return None, {"etag": '"v1"', "last_modified": None}
+
+    monkeypatch.setattr(scraper, "_stored_copy", stored_copy)
+    monkeypatch.setattr(scraper, "_fetch_page", fetch_page)
+
+    async def run():
+        return [await scraper.scrape_url(f"https://example.com/{team_id}", team_id, content_type="blog") for team_id in rows]
+
+    guide, untyped = asyncio.run(run())
+    assert guide.content_type == "guide"
+    assert untyped.content_type == "blog"
+
+
+def test_crawled_links_keep_the_validators_of_their_fetch(scraper, monkeypatch):
+    seen = {}
+
+    async def fetch_page(url, validators=None):
+        return "<html></html>", {"etag": '"v2"', "last_modified": "Tue, 13 Oct 2026 10:00:00 GMT"}
+
+    async def scrape_url(url, team_id, user_id=None, content_type="blog", html=None, validators=None):
+        seen["validators"] = validators
+        return None
+
+    monkeypatch.setattr(scraper, "_fetch_page", fetch_page)
+    monkeypatch.setattr(scraper, "scrape_url", scrape_url)
+    monkeypatch.setattr(scraper, "_collect_links", lambda html, url: [])
+    asyncio.run(scraper._scrape_one_safe("https://example.com/a", "team-etag", None, asyncio.Semaphore(1), True))
+    assert seen["validators"] == {"etag": '"v2"', "last_modified": "Tue, 13 Oct 2026 10:00:00 GMT"}
+
+
+def _fake_crawl(scraper, monkeypatch, site):
+    """Serve the pages in site ({url: links}) to bulk_scrape_with_links and record each link it scrapes"""
+    scraped = []
+
+    async def fetch_page(url, validators=None):
+        return url, {"etag": None, "last_modified": None}
+
+    async def scrape_url(url, team_id, user_id=None, content_type="blog", html=None, validators=None):
+        return server.ScrapedContent(title=url, content="", content_type=content_type, source_url=url, team_id=team_id)
+
+    async def scrape_one_safe(link, team_id, user_id, semaphore, collect_links=False):
+        scraped.append((link, collect_links))
+        return await scrape_url(link, team_id), site.get(link, []) if collect_links else []
+
+    async def no_op(*args, **kwargs):
+        return False
+
+    async def classify(links):
+        return [True] * len(links)
+
+    async def save(collection, docs, label, upsert_on=()):
+        return docs
+
+    monkeypatch.setattr(scraper, "_fetch_page", fetch_page)
+    monkeypatch.setattr(scraper, "scrape_url", scrape_url)
+    monkeypatch.setattr(scraper, "_scrape_one_safe", scrape_one_safe)
+    monkeypatch.setattr(scraper, "_collect_links", lambda html, url: site.get(url, []))
+    monkeypatch.setattr(scraper, "_already_stored", no_op)
+    monkeypatch.setattr(scraper, "_reuse_stored_ids", no_op)
+    monkeypatch.setattr(scraper, "_classify_links_gemini", classify)
+    monkeypatch.setattr(scraper, "gemini_model", object())
+    monkeypatch.setattr(server, "_insert_many_logged", save)
+    return scraped
+
+
+def test_bulk_scrape_stops_at_the_link_budget(scraper, monkeypatch):
+    base = "https://example.com/"
+    site = {base: [f"https://example.com/post-{n}" for n in range(5)]}
+    scraped = _fake_crawl(scraper, monkeypatch, site)
+
+    response = asyncio.run(scraper.bulk_scrape_with_links(base, "team-budget", max_depth=1, max_links=3))
+    assert [link for link, _ in scraped] == site[base][:3]
+    assert [item.source_url for item in response.items] == [base] + site[base][:3]
+
+
+def test_bulk_scrape_follows_links_down_to_max_depth(scraper, monkeypatch):
+    base = "https://example.com/"
+    site = {
+        base: ["https://example.com/a", base],
+        "https://example.com/a": ["https://example.com/b"],
+        "https://example.com/b": ["https://example.com/c"],
+    }
+    scraped = _fake_crawl(scraper, monkeypatch, site)
+
+    asyncio.run(scraper.bulk_scrape_with_links(base, "team-depth", max_depth=2, max_links=10))
+    # The base page is never revisited, and pages at max_depth are not expanded further
+    assert scraped == [("https://example.com/a", True), ("https://example.com/b", False)]
+
+
+def test_heading_sections_keep_the_text_of_their_opening_page(scraper):
+    pages = ["Preface text", "CHAPTER ONE\nFirst body", "More of chapter one", "2. Second Chapter\nSecond body"]
+    assert scraper._chunk_by_headings(pages) == [
+        (None, "Preface text", "1-1"),
+        ("CHAPTER ONE", "CHAPTER ONE\nFirst body\nMore of chapter one", "2-3"),
+        ("2. Second Chapter", "2. Second Chapter\nSecond body", "4-4"),
+    ]